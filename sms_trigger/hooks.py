@@ -144,7 +144,26 @@ notification_config = "sms_trigger.sms_trigger.notifications.get_notification_co
 
 doc_events = {
 	"POS Invoice": {
-		"on_submit": "sms_trigger.sms_trigger.utils.pos_sms.send_pos_invoice_sms"
+		"on_submit": [
+			"sms_trigger.sms_trigger.utils.pos_sms.send_pos_invoice_sms",
+			"sms_trigger.sms_trigger.utils.purchases.update_last_purchase_date"
+		],
+		"on_cancel": "sms_trigger.sms_trigger.utils.purchases.update_last_purchase_date"
+	},
+	"Sales Invoice": {
+		"on_submit": "sms_trigger.sms_trigger.utils.purchases.update_last_purchase_date",
+		"on_cancel": "sms_trigger.sms_trigger.utils.purchases.update_last_purchase_date"
+	},
+	"SMS Settings": {
+		"on_update": "sms_trigger.sms_trigger.utils.settings.clear_settings_cache"
+	},
+	"Customer": {
+		"validate": [
+			"sms_trigger.sms_trigger.utils.phone.set_customer_mobile",
+			"sms_trigger.sms_trigger.utils.birthdays.set_birth_month_day"
+		],
+		"on_update": "sms_trigger.sms_trigger.utils.pos_otp.clear_customer_attributes",
+		"on_trash": "sms_trigger.sms_trigger.utils.pos_otp.clear_customer_attributes"
 	}
 }
 
@@ -161,6 +180,12 @@ scheduler_events = {
 		],
 		"0/15 * * * *": [
 			"sms_trigger.sms_trigger.doctype.bulk_sms.bulk_sms.process_scheduled_campaigns"
+		],
+		"*/5 * * * *": [
+			"sms_trigger.sms_trigger.doctype.bulk_sms.bulk_sms.recover_stale_shards"
+		],
+		"* * * * *": [
+			"sms_trigger.sms_trigger.utils.trigger_engine.send_transactional_sms"
 		]
 	},
 	"hourly": [
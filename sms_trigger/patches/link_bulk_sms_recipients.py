@@ -0,0 +1,13 @@
+import frappe
+
+
+def execute():
+	"""Bulk SMS Recipient was a child table of Bulk SMS, link existing rows to their campaign"""
+	if not frappe.db.has_column("Bulk SMS Recipient", "parent"):
+		return
+
+	frappe.db.sql("""
+		UPDATE `tabBulk SMS Recipient`
+		SET bulk_sms = parent
+		WHERE parenttype = 'Bulk SMS' AND IFNULL(bulk_sms, '') = ''
+	""")
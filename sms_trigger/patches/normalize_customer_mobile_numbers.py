@@ -0,0 +1,10 @@
+import frappe
+
+from sms_trigger.sms_trigger.install import create_custom_fields
+from sms_trigger.sms_trigger.utils.phone import backfill_customer_mobiles
+
+
+def execute():
+	create_custom_fields()
+	frappe.clear_cache(doctype="Customer")
+	backfill_customer_mobiles()
@@ -0,0 +1,10 @@
+import frappe
+
+from sms_trigger.sms_trigger.install import create_custom_fields
+from sms_trigger.sms_trigger.utils.birthdays import backfill_birth_month_day
+
+
+def execute():
+	create_custom_fields()
+	frappe.clear_cache(doctype="Customer")
+	backfill_birth_month_day()
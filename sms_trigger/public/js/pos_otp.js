@@ -9,6 +9,7 @@ sms_trigger.pos.OTPController = class OTPController {
     constructor(wrapper) {
         this.wrapper = wrapper;
         this.verified_customers = []; // simple session cache
+        this.requirement_cache = {}; // OTP requirement per customer and discount, for this POS session
         this.init();
     }
 
@@ -102,17 +103,28 @@ sms_trigger.pos.OTPController = class OTPController {
     }
 
     check_otp_requirement(customer, doc) {
+        const me = this;
+        const discount_amount = doc.discount_amount || doc.base_discount_amount || 0;
+        // The server only looks at the customer and whether there is a discount
+        const key = `${customer}::${flt(discount_amount) > 0 ? 1 : 0}`;
+
+        if (key in this.requirement_cache) {
+            return Promise.resolve(this.requirement_cache[key]);
+        }
+
         return new Promise(resolve => {
             frappe.call({
                 method: 'sms_trigger.sms_trigger.utils.pos_otp.check_otp_requirement',
                 args: {
                     customer: customer,
                     grand_total: doc.grand_total,
-                    discount_amount: doc.discount_amount || doc.base_discount_amount || 0
+                    discount_amount: discount_amount
                     // We can add item level checks here if we parse items array and calculate sum
                 },
                 callback: function (r) {
-                    resolve(r.message && r.message.required);
+                    const required = !!(r.message && r.message.required);
+                    me.requirement_cache[key] = required;
+                    resolve(required);
                 }
             });
         });
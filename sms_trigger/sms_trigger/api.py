@@ -180,6 +180,13 @@ def validate_sms_conditions(conditions):
 		parsed = json.loads(conditions)
 		if not isinstance(parsed, dict):
 			return {"valid": False, "error": "Conditions must be a JSON object"}
+
+		# Same checks as saving a rule: Customer fields and supported operators
+		from sms_trigger.sms_trigger.utils.conditions import compile_conditions
+		try:
+			compile_conditions(frappe._dict(use_json=1, conditions=parsed))
+		except frappe.ValidationError as e:
+			return {"valid": False, "error": str(e)}
 		return {"valid": True, "parsed": parsed}
 	except json.JSONDecodeError as e:
 		return {"valid": False, "error": f"Invalid JSON: {str(e)}"}
@@ -227,6 +234,26 @@ def test_sms_rule(rule_name, test_customer=None):
 		frappe.log_error(f"Error testing SMS rule: {str(e)}", "SMS Trigger API Error")
 		return {"success": False, "error": str(e)}
 
+@frappe.whitelist()
+def dry_run_sms_rule(rule_name):
+	"""Count the customers a rule would currently match, without scheduling anything"""
+	try:
+		rule = frappe.get_doc("SMS Trigger Rule", rule_name)
+		rule.check_permission("read")
+
+		from sms_trigger.sms_trigger.utils.conditions import get_condition_plan
+		from sms_trigger.sms_trigger.utils.trigger_engine import count_rule_candidates
+
+		plan = get_condition_plan(rule)
+		return {
+			"success": True,
+			"count": count_rule_candidates(rule),
+			"filters": plan.get_filters(),
+			"params": plan.params
+		}
+	except Exception as e:
+		return {"success": False, "error": str(e)}
+
 @frappe.whitelist()
 def get_customer_sms_history(customer, limit=50):
 	"""Get SMS history for a specific customer"""
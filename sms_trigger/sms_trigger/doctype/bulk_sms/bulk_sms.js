@@ -11,6 +11,12 @@ frappe.ui.form.on('Bulk SMS', {
 				frm.trigger('load_recipients');
 			});
 
+			if (!frm.is_new()) {
+				frm.add_custom_button(__('Add Recipients'), function () {
+					frm.trigger('add_recipients');
+				});
+			}
+
 			if (frm.doc.total_recipients > 0) {
 				frm.add_custom_button(__('Sent'), function () {
 					frm.submit();
@@ -53,17 +59,37 @@ frappe.ui.form.on('Bulk SMS', {
 			doc: frm.doc,
 			callback: function (r) {
 				if (r.message) {
-					frm.clear_table('recipients');
-					r.message.forEach(function (d) {
-						let row = frm.add_child('recipients');
-						row.customer = d.customer;
-						row.customer_name = d.customer_name;
-						row.mobile_no = d.mobile_no;
-						row.status = d.status;
-					});
-					frm.refresh_field('recipients');
-					frm.set_value('total_recipients', r.message.length);
+					if (r.message.saved) {
+						// Rows were written straight to the database
+						frm.reload_doc();
+					} else {
+						// Rows are streamed in when the campaign is first saved
+						frm.set_value('total_recipients', r.message.total_recipients);
+					}
+				}
+			}
+		});
+	},
+
+	add_recipients: function (frm) {
+		new frappe.ui.form.MultiSelectDialog({
+			doctype: 'Customer',
+			target: frm,
+			setters: {
+				customer_group: null,
+				territory: null
+			},
+			get_query: function () {
+				return { filters: { sms_enabled: 1 } };
+			},
+			action: function (selections) {
+				if (!selections.length) {
+					return;
 				}
+				this.dialog.hide();
+				frm.call('add_recipients', { customers: selections }).then(function () {
+					frm.reload_doc();
+				});
 			}
 		});
 	}
@@ -1,7 +1,14 @@
 import frappe
 from frappe.model.document import Document
-from frappe.utils import now_datetime, get_datetime
+from frappe.utils import add_to_date, cint, now_datetime, get_datetime
 import json
+import time
+from sms_trigger.sms_trigger.utils.phone import INVALID_NUMBER_ERROR, normalize_many
+
+# Recipients are loaded, counted and sent in chunks of this size
+RECIPIENT_CHUNK_SIZE = 1000
+# Send results are written back to the database in batches of this size
+RESULT_WRITE_SIZE = 100
 
 class BulkSMS(Document):
 	def validate(self):
@@ -19,66 +26,85 @@ class BulkSMS(Document):
 		if len(self.message) > 1600:
 			frappe.throw("Message cannot exceed 1600 characters")
 
-		# Validate recipients on save
-		if self.recipients:
-			for r in self.recipients:
-				if r.status not in ["Sent"]: # Don't touch sent ones
-					if not r.mobile_no or len(r.mobile_no) < 5:
-						r.status = "Invalid"
-						r.error_message = "Invalid Mobile Number length"
-					elif r.status == "Invalid": # Auto-recover if fixed
-						r.status = "Pending"
-						r.error_message = None
+	def on_update(self):
+		from sms_trigger.sms_trigger.utils.template_cache import invalidate_changed_templates
+		invalidate_changed_templates(self, ["message"])
+
+		# Streamed once the campaign row exists for the recipients to link to
+		if self.flags.stream_recipients:
+			self.flags.stream_recipients = False
+			self.stream_recipients()
 
 	def before_save(self):
-		# Only auto-load if no manual recipients exist
-		if not self.recipients and self.filter_by:
-			self.load_recipients()
-		# Update total count
-		self.total_recipients = len(self.recipients)
+		# Recipients are their own records, saving or submitting the campaign only counts them
+		if not self.is_new():
+			self.total_recipients = frappe.db.count("Bulk SMS Recipient", {"bulk_sms": self.name})
+		# Only auto-load if no recipients exist
+		if self.filter_by and (self.is_new() or not self.total_recipients):
+			self.flags.stream_recipients = True
+
+	def on_trash(self):
+		frappe.db.delete("Bulk SMS Recipient", {"bulk_sms": self.name})
 	
 	@frappe.whitelist()
 	def load_recipients(self):
 		"""Load recipients based on filter criteria"""
-		customers = self.get_filtered_customers()
+		if self.docstatus != 0:
+			frappe.throw("Recipients can only be loaded on a draft campaign")
 		
-		# Clear existing recipients only when explicitly loading
-		self.recipients = []
-		for customer in customers:
-			status = "Pending"
-			error = None
-			if not customer.mobile_no or len(customer.mobile_no) < 5:
-				status = "Invalid"
-				error = "Invalid Mobile Number length"
-
-			if customer.mobile_no: # Still only add existing ones? Or all? 
-                # Original logic: only if customer.mobile_no:
-                # But "Invalid" implies we added it but it's bad.
-                # If mobile_no is Empty, usually we skip it. 
-                # "Load Recipients" should probably SKIP empty numbers. 
-                # "Invalid" is for "000" or "abc".
-                # Let's keep existing logic: check if customer.mobile_no exists.
-				self.append("recipients", {
-					"customer": customer.name,
-					"customer_name": customer.customer_name,
-					"mobile_no": customer.mobile_no,
-					"status": status,
-                    "error_message": error
-				})
-		
-		self.total_recipients = len(self.recipients)
+		if self.is_new():
+			# Nothing to attach rows to yet, they are streamed in when the campaign is saved
+			self.total_recipients = self.count_filtered_customers()
+		else:
+			self.total_recipients = self.stream_recipients()
 		
 		if self.total_recipients == 0:
 			frappe.msgprint("No recipients found matching criteria. Ensure customers have Mobile No and SMS Enabled.")
 			
-		return self.recipients
+		return {"total_recipients": self.total_recipients, "saved": not self.is_new()}
 	
+	def stream_recipients(self, chunk_size=RECIPIENT_CHUNK_SIZE):
+		"""Write matching customers straight into the recipient table, one chunk at a time"""
+		frappe.db.delete("Bulk SMS Recipient", {"bulk_sms": self.name})
+
+		total = 0
+		for customers in self.iter_filtered_customers(chunk_size):
+			total += insert_recipients(self.name, customers, start_idx=total + 1)
+
+		self.db_set("total_recipients", total, update_modified=False)
+		return total
+
+	@frappe.whitelist()
+	def add_recipients(self, customers):
+		"""Add hand-picked customers to a draft campaign, skipping those already on it"""
+		from sms_trigger.sms_trigger.doctype.bulk_sms_recipient.bulk_sms_recipient import (
+			get_next_idx,
+			update_total_recipients,
+		)
 
+		if self.docstatus != 0:
+			frappe.throw("Recipients can only be added to a draft campaign")
+
+		customers = frappe.parse_json(customers) if isinstance(customers, str) else customers
+		existing = set(frappe.get_all("Bulk SMS Recipient",
+			filters={"bulk_sms": self.name, "customer": ["in", customers]},
+			pluck="customer"
+		))
+		new_customers = [customer for customer in customers if customer not in existing]
+		if new_customers:
+			insert_recipients(self.name, frappe.get_all("Customer",
+				filters={"name": ["in", new_customers]},
+				fields=["name", "customer_name", "mobile_no", "normalized_mobile_no"],
+				order_by="name asc"
+			), start_idx=get_next_idx(self.name))
+
+		self.total_recipients = update_total_recipients(self.name)
+		return {"total_recipients": self.total_recipients, "added": len(new_customers)}
 	
-	def get_filtered_customers(self):
-		"""Get customers based on filter criteria"""
+	def get_customer_filters(self):
+		"""Build Customer filters from the filter criteria, None for manual selection"""
 		if not self.filter_by:
-			return []  # Manual selection - no auto-load
+			return None  # Manual selection - no auto-load
 		
 		if self.filter_by == "All Customers":
 			pass  # Use base filters only
@@ -110,10 +136,36 @@ class BulkSMS(Document):
 			except json.JSONDecodeError:
 				frappe.throw("Invalid JSON format in custom filter")
 		
-		return frappe.get_all("Customer", 
-			filters=filters,
-			fields=["name", "customer_name", "mobile_no"]
-		)
+		return [
+			[field, value[0], value[1]] if isinstance(value, (list, tuple)) else [field, "=", value]
+			for field, value in filters.items()
+		]
+
+	def iter_filtered_customers(self, chunk_size=RECIPIENT_CHUNK_SIZE):
+		"""Yield matching customers in chunks, paginated on name so no chunk is re-read"""
+		filters = self.get_customer_filters()
+		if filters is None:
+			return
+
+		last_name = ""
+		while True:
+			customers = frappe.get_all("Customer", 
+				filters=[*filters, ["name", ">", last_name]],
+				fields=["name", "customer_name", "mobile_no", "normalized_mobile_no"],
+				order_by="name asc",
+				limit=chunk_size
+			)
+			if not customers:
+				break
+
+			yield customers
+			last_name = customers[-1].name
+
+	def count_filtered_customers(self):
+		filters = self.get_customer_filters()
+		if filters is None:
+			return 0
+		return frappe.db.count("Customer", filters)
 	
 	def on_submit(self):
 		"""Auto-send SMS when document is submitted"""
@@ -124,26 +176,20 @@ class BulkSMS(Document):
 		"""Send bulk SMS to all recipients"""
 		if self.docstatus != 1:
 			frappe.throw("Document must be submitted to send SMS")
+
+		# Locked until commit, so concurrent calls cannot queue the campaign twice
+		if frappe.db.get_value("Bulk SMS", self.name, "status", for_update=True) not in ("Draft", "Scheduled"):
+			frappe.throw("Bulk SMS has already been queued for sending")
 		
 		# Check for scheduling
 		if self.scheduled_datetime and get_datetime(self.scheduled_datetime) > now_datetime():
-			self.status = "Scheduled"
-			self.save()
+			self.db_set("status", "Scheduled")
 			frappe.msgprint(f"Bulk SMS scheduled for {self.scheduled_datetime}")
 		else:
-			self.status = "Queued"
-			self.save()
-			
-			# Create queue log
-			create_sms_queue_log(self)
+			self.db_set("status", "Queued")
 			
-			# Queue background job for sending
-			frappe.enqueue(
-				"sms_trigger.sms_trigger.doctype.bulk_sms.bulk_sms.process_bulk_sms",
-				bulk_sms_name=self.name,
-				queue="default",
-				timeout=3600
-			)
+			# Queue one background job per shard of recipients
+			enqueue_campaign(self.name)
 			
 			frappe.msgprint("Bulk SMS queued for sending")
 	
@@ -154,181 +200,678 @@ class BulkSMS(Document):
 			frappe.throw("Can only retry from Failed or Completed status on submitted document")
 		
 		# Reset failed recipients to pending
-		failed_count = 0
-		for recipient in self.recipients:
-			if recipient.status == "Failed":
-				recipient.status = "Pending"
-				recipient.error_message = ""
-				failed_count += 1
+		failed_count = frappe.db.count("Bulk SMS Recipient", {"bulk_sms": self.name, "status": "Failed"})
 		
 		if failed_count == 0:
 			frappe.throw("No failed SMS to retry")
+
+		# The campaign resends these itself, drop their background retries
+		frappe.db.sql("""
+			UPDATE `tabScheduled SMS` s
+			JOIN `tabBulk SMS Recipient` r ON r.name = s.reference_name
+			SET s.status = 'Failed', s.error_message = 'Superseded by campaign retry'
+			WHERE s.reference_doctype = 'Bulk SMS Recipient' AND s.status = 'Draft'
+				AND r.bulk_sms = %s AND r.status = 'Failed'
+		""", (self.name,))
+
+		frappe.db.sql("""
+			UPDATE `tabBulk SMS Recipient`
+			SET status = 'Pending', error_message = ''
+			WHERE bulk_sms = %s AND status = 'Failed'
+		""", (self.name,))
+
+		self.db_set("status", "Queued")
 		
-		self.status = "Queued"
-		self.save()
-		
-		# Queue background job for retry
-		frappe.enqueue(
-			"sms_trigger.sms_trigger.doctype.bulk_sms.bulk_sms.process_bulk_sms",
-			bulk_sms_name=self.name,
-			queue="default",
-			timeout=3600
-		)
+		# Queue background jobs for retry
+		enqueue_campaign(self.name)
 		
 		frappe.msgprint(f"Retrying {failed_count} failed SMS")
 	
 	def update_counts(self):
 		"""Update success and failed counts"""
-		success_count = 0
-		failed_count = 0
+		self.success_count, self.failed_count = update_counts(self.name)
+
+def get_recipient_counts(bulk_sms_name, start_idx=None, end_idx=None):
+	"""Recipient count per status, optionally limited to an idx range"""
+	conditions = ""
+	values = [bulk_sms_name]
+	if start_idx is not None and end_idx is not None:
+		conditions = "AND idx BETWEEN %s AND %s"
+		values += [start_idx, end_idx]
+
+	return dict(frappe.db.sql(f"""
+		SELECT status, COUNT(*)
+		FROM `tabBulk SMS Recipient`
+		WHERE bulk_sms = %s {conditions}
+		GROUP BY status
+	""", values))
+
+def update_counts(bulk_sms_name):
+	"""Recount recipient statuses in the database and store them on the campaign"""
+	counts = get_recipient_counts(bulk_sms_name)
+
+	success_count = counts.get("Sent", 0)
+	failed_count = counts.get("Failed", 0) + counts.get("Invalid", 0)
+	frappe.db.set_value("Bulk SMS", bulk_sms_name, {
+		"success_count": success_count,
+		"failed_count": failed_count
+	}, update_modified=False)
+	return success_count, failed_count
+
+class ProgressTracker:
+	"""Aggregate recipient results and flush them to the campaign in batches.
+
+	Counters are bumped with an atomic UPDATE, so a flush costs one row write
+	no matter how large the campaign is. Flushes happen every `flush_size`
+	results or `flush_seconds`, whichever comes first.
+	"""
+
+	def __init__(self, bulk_sms_name, owner, flush_size=None, flush_seconds=None, on_flush=None):
+		from sms_trigger.sms_trigger.utils.settings import get_settings
+		settings = get_settings()
+
+		self.bulk_sms_name = bulk_sms_name
+		self.owner = owner
+		self.flush_size = cint(flush_size or settings.progress_flush_size) or 100
+		self.flush_seconds = cint(flush_seconds or settings.progress_flush_seconds) or 5
+		self.processed = 0
+		self.pending_success = 0
+		self.pending_failed = 0
+		self.last_flush = time.monotonic()
+		self.on_flush = on_flush
+
+	def add(self, status):
+		self.processed += 1
+		if status == "Sent":
+			self.pending_success += 1
+		elif status in ("Failed", "Invalid"):
+			self.pending_failed += 1
+
+		if (self.pending_success + self.pending_failed >= self.flush_size
+			or time.monotonic() - self.last_flush >= self.flush_seconds):
+			self.flush()
+
+	def flush(self):
+		"""Write accumulated counts and publish realtime progress"""
+		if self.pending_success or self.pending_failed:
+			frappe.db.sql("""
+				UPDATE `tabBulk SMS`
+				SET success_count = IFNULL(success_count, 0) + %s,
+					failed_count = IFNULL(failed_count, 0) + %s
+				WHERE name = %s
+			""", (self.pending_success, self.pending_failed, self.bulk_sms_name))
+			self.pending_success = 0
+			self.pending_failed = 0
+
+		self.last_flush = time.monotonic()
+
+		success_count, failed_count = frappe.db.get_value("Bulk SMS", self.bulk_sms_name,
+			["success_count", "failed_count"])
+		frappe.publish_realtime(
+			"bulk_sms_progress",
+			{"processed": self.processed, "success": success_count, "failed": failed_count},
+			user=self.owner
+		)
+
+		if self.on_flush:
+			self.on_flush()
+
+def iter_recipients(bulk_sms_name, status=None, chunk_size=RECIPIENT_CHUNK_SIZE, start_idx=None, end_idx=None):
+	"""Yield recipient rows of a campaign in chunks, paginated on idx"""
+	last_idx = (start_idx or 1) - 1
+	while True:
+		filters = [["bulk_sms", "=", bulk_sms_name], ["idx", ">", last_idx]]
+		if end_idx:
+			filters.append(["idx", "<=", end_idx])
+		if status:
+			filters.append(["status", "=", status])
 		
-		for recipient in self.recipients:
-			if recipient.status == "Sent":
-				success_count += 1
-			elif recipient.status == "Failed":
-				failed_count += 1
+		recipients = frappe.get_all("Bulk SMS Recipient",
+			filters=filters,
+			fields=["name", "idx", "customer", "customer_name", "mobile_no", "status", "sent_datetime", "error_message"],
+			order_by="idx asc",
+			limit=chunk_size
+		)
+		if not recipients:
+			break
 		
-		self.success_count = success_count
-		self.failed_count = failed_count
-		self.save(ignore_version=True, ignore_permissions=True)
+		yield recipients
+		last_idx = recipients[-1].idx
+
+def insert_recipients(bulk_sms_name, customers, start_idx=1):
+	"""Insert customers as recipients of a campaign in one multi-row insert, numbered from `start_idx`.
+
+	Customers without a mobile number are skipped, those whose number did not
+	normalize are added as Invalid. Returns the number of recipients inserted.
+	"""
+	from frappe.model.naming import make_autoname
+
+	now = now_datetime()
+	user = frappe.session.user
+	rows = []
+	for customer in customers:
+		if not customer.mobile_no:
+			continue
+
+		status = "Pending"
+		error = None
+		if not customer.normalized_mobile_no:
+			status = "Invalid"
+			error = INVALID_NUMBER_ERROR
+
+		rows.append((
+			make_autoname("hash", "Bulk SMS Recipient"), bulk_sms_name, start_idx + len(rows),
+			user, user, now, now, customer.name, customer.customer_name,
+			customer.normalized_mobile_no or customer.mobile_no, status, error
+		))
+
+	if rows:
+		frappe.db.bulk_insert("Bulk SMS Recipient", [
+			"name", "bulk_sms", "idx", "owner", "modified_by", "creation", "modified",
+			"customer", "customer_name", "mobile_no", "status", "error_message"
+		], rows)
+	return len(rows)
+
+def update_recipients(recipients):
+	"""Write the send results of recipient rows, one UPDATE per distinct result"""
+	groups = {}
+	for recipient in recipients:
+		key = (recipient.status, recipient.sent_datetime, recipient.error_message)
+		groups.setdefault(key, []).append(recipient.name)
+
+	for (status, sent_datetime, error_message), names in groups.items():
+		frappe.db.sql("""
+			UPDATE `tabBulk SMS Recipient`
+			SET status = %s, sent_datetime = %s, error_message = %s
+			WHERE name IN %s
+		""", (status, sent_datetime, error_message, tuple(names)))
 
 def process_bulk_sms(bulk_sms_name):
-	"""Background job to process bulk SMS"""
-	doc = frappe.get_doc("Bulk SMS", bulk_sms_name)
-	# doc.reload() # No need to reload if we use set_value for status first
-	frappe.db.set_value("Bulk SMS", bulk_sms_name, "status", "Sending")
-	frappe.db.commit() # Ensure status is committed
-	doc.reload() # Reload to get correct modified timestamp
-	
-	# Update queue log
-	update_sms_queue_log(bulk_sms_name, "Processing", started_datetime=now_datetime())
-	
-	from sms_trigger.sms_trigger.utils.sms_gateway import send_sms
+	"""Background job of the unsharded sender, kept for jobs queued before the upgrade"""
+	enqueue_campaign(bulk_sms_name)
+	frappe.db.commit()
+
+def enqueue_campaign(bulk_sms_name):
+	"""Split the pending recipients of a campaign into shards and enqueue one job per shard.
+
+	Shards are contiguous idx ranges of pending recipients, so every job pages
+	through its own slice of the recipient table and large campaigns spread
+	over as many workers as the queue has.
+	"""
+	settings = get_shard_settings()
+	shard_size = settings.shard_size
 	
-	success_count = 0
-	failed_count = 0
+	pending_idx = frappe.get_all("Bulk SMS Recipient",
+		filters={"bulk_sms": bulk_sms_name, "status": "Pending"},
+		pluck="idx",
+		order_by="idx asc"
+	)
+	ranges = [
+		(pending_idx[start], pending_idx[min(start + shard_size, len(pending_idx)) - 1])
+		for start in range(0, len(pending_idx), shard_size)
+	]
 	
-	processed_count = 0
-	for recipient in doc.recipients:
-		# Only process pending SMS (for retry functionality)
-		if recipient.status != "Pending":
-			if recipient.status == "Sent":
-				success_count += 1
-			elif recipient.status == "Failed" or recipient.status == "Invalid":
-				failed_count += 1
-			continue
-			
+	# Counters are recounted once here (a retry resets Failed rows), shards only add to them
+	update_counts(bulk_sms_name)
+
+	campaign = frappe.db.get_value("Bulk SMS", bulk_sms_name, ["name", "total_recipients"], as_dict=True)
+	queue_log = create_sms_queue_log(campaign, total_shards=len(ranges))
+
+	for shard_no, (start_idx, end_idx) in enumerate(ranges, 1):
+		shard = frappe.get_doc({
+			"doctype": "Bulk SMS Shard",
+			"bulk_sms": bulk_sms_name,
+			"queue_log": queue_log,
+			"shard_no": shard_no,
+			"start_idx": start_idx,
+			"end_idx": end_idx,
+			"status": "Queued"
+		}).insert(ignore_permissions=True)
+
+		enqueue_shard(shard.name, settings=settings)
+
+	if not ranges:
+		finalize_campaign(bulk_sms_name, queue_log)
+
+	return queue_log
+
+def get_shard_settings():
+	from sms_trigger.sms_trigger.utils.settings import get_settings
+	settings = get_settings()
+	return frappe._dict(
+		queue=settings.bulk_sms_queue or "long",
+		shard_size=cint(settings.bulk_sms_shard_size) or 5000,
+		timeout=cint(settings.bulk_sms_shard_timeout) or 1800,
+		lease_seconds=cint(settings.bulk_sms_lease_seconds) or 300,
+		max_attempts=cint(settings.bulk_sms_max_shard_attempts) or 3
+	)
+
+def enqueue_shard(shard_name, attempt=1, settings=None):
+	settings = settings or get_shard_settings()
+	# Every attempt gets its own job id, the killed job may still be registered
+	job_id = f"bulk_sms_shard::{shard_name}" + (f"::{attempt}" if attempt > 1 else "")
+	frappe.db.set_value("Bulk SMS Shard", shard_name, "job_id", job_id, update_modified=False)
+
+	frappe.enqueue(
+		"sms_trigger.sms_trigger.doctype.bulk_sms.bulk_sms.process_bulk_sms_shard",
+		shard_name=shard_name,
+		queue=settings.queue,
+		timeout=settings.timeout,
+		job_id=job_id,
+		enqueue_after_commit=True
+	)
+
+class ShardLeaseLost(Exception):
+	"""The shard was re-queued by recovery or claimed by a newer attempt"""
+
+def is_shard_owner(shard_name, attempt):
+	"""Lock the shard row and check that `attempt` is the attempt processing it"""
+	shard = frappe.db.get_value("Bulk SMS Shard", shard_name, ["status", "attempts"], as_dict=True, for_update=True)
+	return bool(shard) and shard.status == "Processing" and cint(shard.attempts) == cint(attempt)
+
+def renew_lease(shard_name, lease_seconds, attempt, last_idx=None):
+	"""Record a heartbeat for a running shard attempt, optionally moving its checkpoint.
+
+	Raises ShardLeaseLost once the attempt no longer owns the shard, so a worker
+	that outlived its lease stops sending instead of racing the new attempt.
+	"""
+	if not is_shard_owner(shard_name, attempt):
+		raise ShardLeaseLost(f"Shard {shard_name} is no longer owned by attempt {attempt}")
+
+	values = {
+		"heartbeat": now_datetime(),
+		"lease_expires": add_to_date(now_datetime(), seconds=lease_seconds)
+	}
+	if last_idx is not None:
+		values["last_idx"] = last_idx
+	frappe.db.set_value("Bulk SMS Shard", shard_name, values, update_modified=False)
+
+def claim_recipients(shard, recipients):
+	"""Mark recipients as in flight right before their gateway request, returning the ones claimed.
+
+	A row still marked Sending after a crash may or may not have been delivered,
+	so recovery fails it instead of sending it again. Rows are claimed with the
+	attempt's token and only while the attempt owns the shard, so overlapping
+	jobs never both send a row.
+	"""
+	names = [recipient.name for recipient in recipients]
+	if not names:
+		return []
+
+	token = f"{shard.name}::{shard.attempts}"
+	frappe.db.sql("""
+		UPDATE `tabBulk SMS Recipient` r
+		JOIN `tabBulk SMS Shard` s ON s.name = %s
+		SET r.status = 'Sending', r.claim_token = %s
+		WHERE r.name IN %s AND r.status = 'Pending'
+			AND s.status = 'Processing' AND s.attempts = %s
+	""", (shard.name, token, tuple(names), shard.attempts))
+	claimed = set(frappe.get_all("Bulk SMS Recipient",
+		filters={"name": ["in", names], "claim_token": token, "status": "Sending"},
+		pluck="name"
+	))
+	frappe.db.commit()
+
+	return [recipient for recipient in recipients if recipient.name in claimed]
+
+def process_bulk_sms_shard(shard_name):
+	"""Background job to send one shard of a campaign, resuming from its checkpoint"""
+	settings = get_shard_settings()
+
+	shard = frappe.db.get_value("Bulk SMS Shard", shard_name,
+		["name", "bulk_sms", "queue_log", "start_idx", "end_idx", "last_idx", "attempts", "status"],
+		as_dict=True, for_update=True)
+	if not shard or shard.status != "Queued":
+		return
+
+	# The attempt number fences every later write of this job
+	shard.attempts = cint(shard.attempts) + 1
+	frappe.db.set_value("Bulk SMS Shard", shard_name, {
+		"status": "Processing",
+		"attempts": shard.attempts,
+		"started_datetime": now_datetime()
+	}, update_modified=False)
+	renew_lease(shard_name, settings.lease_seconds, shard.attempts)
+
+	# The first shard to start moves the campaign and its queue log forward
+	frappe.db.sql("""
+		UPDATE `tabBulk SMS` SET status = 'Sending'
+		WHERE name = %s AND status = 'Queued'
+	""", (shard.bulk_sms,))
+	frappe.db.sql("""
+		UPDATE `tabSMS Queue Log`
+		SET queue_status = 'Processing', started_datetime = IFNULL(started_datetime, %s)
+		WHERE name = %s AND queue_status = 'Queued'
+	""", (now_datetime(), shard.queue_log))
+	frappe.db.commit()
+
+	campaign = frappe.db.get_value("Bulk SMS", shard.bulk_sms,
+		["name", "campaign_name", "message", "owner"], as_dict=True)
+
+	# Every progress flush commits the recipients sent so far and renews the lease
+	def heartbeat():
+		renew_lease(shard_name, settings.lease_seconds, shard.attempts)
+		frappe.db.commit()
+
+	progress = ProgressTracker(shard.bulk_sms, campaign.owner, on_flush=heartbeat)
+
+	status = "Completed"
+	error_message = None
+	try:
+		for recipients in iter_recipients(shard.bulk_sms, status="Pending",
+				start_idx=max(cint(shard.start_idx), cint(shard.last_idx) + 1), end_idx=shard.end_idx):
+			send_to_recipients(campaign, recipients, progress,
+				claim=lambda recipients: claim_recipients(shard, recipients))
+			progress.flush()
+			renew_lease(shard_name, settings.lease_seconds, shard.attempts, last_idx=recipients[-1].idx)
+			frappe.db.commit()
+	except ShardLeaseLost as e:
+		# Recovery or a newer attempt owns the shard and its accounting now
+		frappe.db.rollback()
+		frappe.log_error(f"Stopped sending shard {shard_name} of {shard.bulk_sms}: {e}", "Bulk SMS Error")
+		return
+	except Exception as e:
+		frappe.db.rollback()
+		status = "Failed"
+		error_message = str(e)
+		frappe.log_error(f"Error sending shard {shard_name} of {shard.bulk_sms}: {error_message}", "Bulk SMS Error")
+
+	finish_shard(shard, status, error_message)
+	frappe.db.commit()
+
+def fail_in_flight(shard):
+	"""Fail recipients of a shard that were handed to the gateway without a recorded result"""
+	frappe.db.sql("""
+		UPDATE `tabBulk SMS Recipient`
+		SET status = 'Failed', error_message = 'Delivery unknown: worker stopped while sending'
+		WHERE bulk_sms = %s AND status = 'Sending'
+			AND idx BETWEEN %s AND %s
+	""", (shard.bulk_sms, shard.start_idx, shard.end_idx))
+
+def finish_shard(shard, status, error_message=None):
+	"""Record the result of a shard attempt and report it to the coordinator.
+
+	Nothing is recorded or counted when `shard.attempts` no longer owns the shard,
+	so a shard is counted towards its campaign exactly once.
+	"""
+	if not is_shard_owner(shard.name, shard.attempts):
+		return False
+
+	# Rows claimed without a recorded result, whatever stopped the attempt
+	fail_in_flight(shard)
+
+	counts = get_recipient_counts(shard.bulk_sms, shard.start_idx, shard.end_idx)
+	frappe.db.set_value("Bulk SMS Shard", shard.name, {
+		"status": status,
+		"completed_datetime": now_datetime(),
+		"lease_expires": None,
+		"success_count": counts.get("Sent", 0),
+		"failed_count": counts.get("Failed", 0) + counts.get("Invalid", 0),
+		"error_message": error_message
+	}, update_modified=False)
+
+	complete_shard(shard.bulk_sms, shard.queue_log)
+	return True
+
+def recover_stale_shards():
+	"""Resume shards whose worker died or timed out (scheduled job).
+
+	Recipients left in flight are failed as delivery unknown, so a resumed shard
+	never sends the same message twice; everything still Pending is picked up
+	from the checkpoint by a fresh job.
+	"""
+	settings = get_shard_settings()
+	stale_shards = frappe.get_all("Bulk SMS Shard",
+		filters={"status": "Processing", "lease_expires": ["<", now_datetime()]},
+		pluck="name"
+	)
+
+	for shard_name in stale_shards:
 		try:
-			# Validate Mobile Number
-			if not recipient.mobile_no or len(recipient.mobile_no) < 5: 
-				# Basic length check, can be improved with regex or phonenumbers lib
-				recipient.status = "Invalid"
-				recipient.error_message = "Invalid Mobile Number length"
-				failed_count += 1
-				processed_count += 1
-				create_bulk_sms_log(doc, recipient)
+			shard = frappe.db.get_value("Bulk SMS Shard", shard_name,
+				["name", "bulk_sms", "queue_log", "start_idx", "end_idx", "attempts", "status", "lease_expires"],
+				as_dict=True, for_update=True)
+			# Re-check under the lock, the worker may have renewed its lease meanwhile
+			if shard.status != "Processing" or get_datetime(shard.lease_expires) >= now_datetime():
+				frappe.db.rollback()
 				continue
 
-			context = {
-				"customer": recipient.customer,
-				"customer_name": recipient.customer_name,
-				"mobile_no": recipient.mobile_no,
-				"campaign_name": doc.campaign_name
-			}
-			message = frappe.render_template(doc.message, context)
-			result = send_sms(recipient.mobile_no, message)
-			
-			if result.get("success"):
-				recipient.status = "Sent"
-				recipient.sent_datetime = now_datetime()
-				success_count += 1
+			fail_in_flight(shard)
+
+			if cint(shard.attempts) >= settings.max_attempts:
+				finish_shard(shard, "Failed", f"Gave up after {shard.attempts} attempts")
 			else:
-				recipient.status = "Failed"
-				recipient.error_message = result.get("error", "Unknown error")
-				failed_count += 1
-			
-			# Create log entry
-			create_bulk_sms_log(doc, recipient, message=message)
-			
-			processed_count += 1
-			
-			# Save progress and publish update every 1 SMS (Immediate feedback)
-			doc.update_counts()
-			frappe.publish_realtime(
-				"bulk_sms_progress",
-				{"processed": processed_count, "success": success_count, "failed": failed_count},
-				user=doc.owner
-			)
-			
-			# Add delay to avoid rate limiting
-			import time
-			time.sleep(3)  # 3 second delay between SMS
-				
+				frappe.db.set_value("Bulk SMS Shard", shard_name, {
+					"status": "Queued",
+					"lease_expires": None
+				}, update_modified=False)
+				enqueue_shard(shard_name, cint(shard.attempts) + 1, settings)
+
+			frappe.db.commit()
 		except Exception as e:
-			recipient.status = "Failed"
-			recipient.error_message = str(e)
-			failed_count += 1
-			processed_count += 1
-			
-			# Create log entry
-			create_bulk_sms_log(doc, recipient)
-			
-			# Save progress and publish update every 1 SMS (Immediate feedback)
-			doc.update_counts()
-			frappe.publish_realtime(
-				"bulk_sms_progress",
-				{"processed": processed_count, "success": success_count, "failed": failed_count},
-				user=doc.owner
-			)
+			frappe.db.rollback()
+			frappe.log_error(f"Error recovering shard {shard_name}: {e}", "Bulk SMS Error")
 
+def complete_shard(bulk_sms_name, queue_log):
+	"""Count a finished shard and finalize the campaign once every shard is done"""
+	# The increment locks the queue log row until commit, so exactly one
+	# shard observes the final count and finalizes
+	frappe.db.sql("""
+		UPDATE `tabSMS Queue Log`
+		SET completed_shards = IFNULL(completed_shards, 0) + 1
+		WHERE name = %s
+	""", (queue_log,))
+	completed_shards, total_shards = frappe.db.get_value("SMS Queue Log", queue_log,
+		["completed_shards", "total_shards"], for_update=True)
 
-	# Update counts and save
-	doc.update_counts()
-	doc.status = "Completed" if failed_count == 0 else "Failed"
-	doc.save(ignore_version=True, ignore_permissions=True)
-	
-	# Update final queue log
+	if cint(completed_shards) >= cint(total_shards):
+		finalize_campaign(bulk_sms_name, queue_log)
+
+def finalize_campaign(bulk_sms_name, queue_log=None):
+	"""Aggregate recipient results into the campaign and its SMS Queue Log"""
+	success_count, failed_count = update_counts(bulk_sms_name)
+	counts = get_recipient_counts(bulk_sms_name)
+	pending_count = counts.get("Pending", 0) + counts.get("Sending", 0)
+	status = "Completed" if failed_count == 0 and pending_count == 0 else "Failed"
+
+	frappe.db.set_value("Bulk SMS", bulk_sms_name, "status", status)
+
+	started = frappe.db.get_value("SMS Queue Log", queue_log, "started_datetime") if queue_log else None
+	completed = now_datetime()
 	update_sms_queue_log(
-		bulk_sms_name, 
-		"Completed" if failed_count == 0 else "Failed",
-		completed_datetime=now_datetime(),
+		bulk_sms_name,
+		status,
+		queue_log=queue_log,
+		completed_datetime=completed,
 		success_count=success_count,
-		failed_count=failed_count
+		failed_count=failed_count,
+		processing_time=str(completed - get_datetime(started)).split(".")[0] if started else None,
+		error_message=f"{pending_count} recipients were not processed" if pending_count else None
 	)
-	
+
+	owner = frappe.db.get_value("Bulk SMS", bulk_sms_name, "owner")
 	frappe.publish_realtime(
 		"bulk_sms_completed",
 		{"success": success_count, "failed": failed_count},
-		user=doc.owner
+		user=owner
 	)
 
-def create_bulk_sms_log(bulk_sms_doc, recipient, message=None):
-	"""Create log entry for each SMS sent"""
-	frappe.get_doc({
-		"doctype": "Bulk SMS Log",
-		"bulk_sms": bulk_sms_doc.name,
-		"customer": recipient.customer,
-		"customer_name": recipient.customer_name,
-		"mobile_no": recipient.mobile_no,
-		"message": message or bulk_sms_doc.message,
-		"status": recipient.status,
-		"sent_datetime": recipient.sent_datetime,
-		"error_message": recipient.error_message
-	}).insert()
-
-def create_sms_queue_log(bulk_sms_doc):
+def send_to_recipients(campaign, recipients, progress, claim=None):
+	"""Render, send and record one chunk of pending recipients.
+
+	`claim(recipients)` is called right before each gateway request and returns
+	the recipients that may be sent, the others are left untouched.
+	"""
+	from sms_trigger.sms_trigger.utils.dispatch import send_grouped
+	from sms_trigger.sms_trigger.utils.sms_gateway import group_by_message
+	from sms_trigger.sms_trigger.utils.template_cache import render_many
+	
+	# Results are written back in batches, then counted towards progress
+	done = []
+	def record(recipient, message=None):
+		done.append((recipient, message))
+		if len(done) >= RESULT_WRITE_SIZE:
+			flush()
+
+	def flush():
+		write_results(campaign, done)
+		for recipient, _ in done:
+			progress.add(recipient.status)
+		done.clear()
+
+	to_render = []
+	# Stored numbers are already normalized, so this is a pattern check for most rows
+	for recipient, mobile_no in zip(recipients, normalize_many([r.mobile_no for r in recipients]), strict=True):
+		if not mobile_no:
+			recipient.status = "Invalid"
+			recipient.error_message = INVALID_NUMBER_ERROR
+			record(recipient)
+			continue
+
+		recipient.mobile_no = mobile_no
+		to_render.append(recipient)
+
+	# Compile the campaign template once and render every recipient against it
+	def on_render_error(idx, error):
+		recipient = to_render[idx]
+		recipient.status = "Failed"
+		recipient.error_message = str(error)
+		record(recipient)
+
+	messages = render_many(campaign.message, [
+		{
+			"customer": recipient.customer,
+			"customer_name": recipient.customer_name,
+			"mobile_no": recipient.mobile_no,
+			"campaign_name": campaign.campaign_name
+		}
+		for recipient in to_render
+	], on_error=on_render_error)
+
+	jobs = [(recipient, message) for recipient, message in zip(to_render, messages, strict=True) if message is not None]
+
+	def before_send(chunk):
+		claimed = {recipient.name for recipient in claim([recipient for recipient, _ in chunk])}
+		return [job for job in chunk if job[0].name in claimed]
+
+	retries = []
+
+	# Recipients with identical text share one gateway request per chunk;
+	# chunks are sent concurrently, throttled by the shared token bucket
+	chunks = group_by_message(jobs, lambda job: job[1])
+	sent = send_grouped(chunks, lambda job: job[0].mobile_no, before_send=before_send if claim else None)
+	try:
+		for (message, chunk), results in sent:
+			# One timestamp per gateway request, so its rows are written back by a single UPDATE
+			sent_datetime = now_datetime()
+			for (recipient, _), result in zip(chunk, results, strict=True):
+				if result.get("skipped"):
+					continue
+				if result.get("success"):
+					recipient.status = "Sent"
+					recipient.sent_datetime = sent_datetime
+				else:
+					recipient.status = "Failed"
+					recipient.error_message = result.get("error", "Unknown error")
+					if result.get("retryable"):
+						recipient.error_message += " (retry scheduled)"
+						retries.append((recipient, message))
+
+				record(recipient, message)
+	finally:
+		# Stops the senders right away when a flush raises (e.g. the shard lease was lost)
+		sent.close()
+
+	flush()
+
+	if retries:
+		schedule_recipient_retries(retries)
+
+def schedule_recipient_retries(retries):
+	"""Hand recipients that failed with a retryable error over to the Scheduled SMS outbox.
+
+	The worker moves on right away, the pending SMS dispatcher resends them after
+	the backoff and marks the recipient Sent once one of the retries succeeds.
+	"""
+	from sms_trigger.sms_trigger.utils.retry import get_next_attempt_at, get_retry_settings
+	from sms_trigger.sms_trigger.utils.trigger_engine import create_scheduled_sms_bulk
+
+	retry_settings = get_retry_settings()
+	create_scheduled_sms_bulk([
+		frappe._dict(
+			customer=recipient.customer,
+			mobile_no=recipient.mobile_no,
+			message=message,
+			trigger_type="Custom",
+			reference_doctype="Bulk SMS Recipient",
+			reference_name=recipient.name,
+			attempts=1,
+			next_attempt_at=get_next_attempt_at(1, retry_settings)
+		)
+		for recipient, message in retries
+	])
+
+def mark_recipient_retried(recipient_name, sent_datetime):
+	"""Record a successful retry of a failed campaign recipient"""
+	recipient = frappe.db.get_value("Bulk SMS Recipient", recipient_name, ["bulk_sms", "status"], as_dict=True)
+	if not recipient or recipient.status != "Failed":
+		return
+
+	frappe.db.set_value("Bulk SMS Recipient", recipient_name, {
+		"status": "Sent",
+		"sent_datetime": sent_datetime,
+		"error_message": None
+	}, update_modified=False)
+	frappe.db.sql("""
+		UPDATE `tabBulk SMS`
+		SET success_count = IFNULL(success_count, 0) + 1,
+			failed_count = GREATEST(IFNULL(failed_count, 0) - 1, 0)
+		WHERE name = %s
+	""", (recipient.bulk_sms,))
+
+def write_results(campaign, results):
+	"""Record `(recipient, message)` results on the recipient rows and in Bulk SMS Log"""
+	if not results:
+		return
+
+	update_recipients([recipient for recipient, _ in results])
+	create_bulk_sms_logs(campaign, results)
+
+def create_bulk_sms_logs(campaign, results):
+	"""Create one log entry per SMS sent, in a single multi-row insert"""
+	from frappe.model.naming import make_autoname
+
+	now = now_datetime()
+	user = frappe.session.user
+	frappe.db.bulk_insert("Bulk SMS Log", [
+		"name", "owner", "modified_by", "creation", "modified",
+		"bulk_sms", "campaign_name", "customer", "customer_name", "mobile_no",
+		"message", "status", "sent_datetime", "error_message"
+	], [
+		(
+			make_autoname("hash", "Bulk SMS Log"), user, user, now, now,
+			campaign.name, campaign.campaign_name, recipient.customer, recipient.customer_name, recipient.mobile_no,
+			message or campaign.message, recipient.status, recipient.sent_datetime, recipient.error_message
+		)
+		for recipient, message in results
+	])
+
+def create_sms_queue_log(bulk_sms_doc, total_shards=0):
 	"""Create SMS queue log entry"""
-	frappe.get_doc({
+	return frappe.get_doc({
 		"doctype": "SMS Queue Log",
 		"bulk_sms": bulk_sms_doc.name,
 		"queue_status": "Queued",
 		"queued_datetime": now_datetime(),
-		"total_recipients": bulk_sms_doc.total_recipients
-	}).insert()
+		"total_recipients": bulk_sms_doc.total_recipients,
+		"total_shards": total_shards,
+		"completed_shards": 0
+	}).insert(ignore_permissions=True).name
 
-def update_sms_queue_log(bulk_sms_name, status, **kwargs):
+def update_sms_queue_log(bulk_sms_name, status, queue_log=None, **kwargs):
 	"""Update SMS queue log"""
-	queue_log = frappe.db.get_value("SMS Queue Log", {"bulk_sms": bulk_sms_name}, "name")
+	if not queue_log:
+		queue_log = frappe.db.get_value("SMS Queue Log", {"bulk_sms": bulk_sms_name}, "name", order_by="creation desc")
 	if queue_log:
 		doc = frappe.get_doc("SMS Queue Log", queue_log)
 		doc.queue_status = status
@@ -337,7 +880,7 @@ def update_sms_queue_log(bulk_sms_name, status, **kwargs):
 			setattr(doc, key, value)
 		
 		
-		if kwargs.get("success_count") and kwargs.get("failed_count"):
+		if kwargs.get("success_count") is not None and kwargs.get("failed_count") is not None:
 			total = kwargs["success_count"] + kwargs["failed_count"]
 			doc.success_rate = (kwargs["success_count"] / total * 100) if total > 0 else 0
 		
@@ -356,16 +899,8 @@ def process_scheduled_campaigns():
 	
 	for campaign in scheduled_campaigns:
 		# Double check status to avoid race conditions
-		doc = frappe.get_doc("Bulk SMS", campaign.name)
+		doc = frappe.db.get_value("Bulk SMS", campaign.name, ["name", "status", "total_recipients"], as_dict=True)
 		if doc.status == "Scheduled":
-			doc.status = "Queued"
-			doc.save()
-			
-			create_sms_queue_log(doc)
+			frappe.db.set_value("Bulk SMS", doc.name, "status", "Queued")
 			
-			frappe.enqueue(
-				"sms_trigger.sms_trigger.doctype.bulk_sms.bulk_sms.process_bulk_sms",
-				bulk_sms_name=doc.name,
-				queue="default",
-				timeout=3600
-			)
\ No newline at end of file
+			enqueue_campaign(doc.name)
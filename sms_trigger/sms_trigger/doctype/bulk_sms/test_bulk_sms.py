@@ -1,9 +1,118 @@
 # Copyright (c) 2025, primetechbd and Contributors
 # See license.txt
 
-# import frappe
+import json
+
+import frappe
 from frappe.tests.utils import FrappeTestCase
 
+from sms_trigger.sms_trigger.doctype.bulk_sms.bulk_sms import (
+	claim_recipients,
+	get_recipient_counts,
+	iter_recipients,
+)
+
+TEST_CUSTOMERS = {
+	"_Test Bulk SMS Customer 1": "+8801712345611",
+	"_Test Bulk SMS Customer 2": "+8801712345612",
+	"_Test Bulk SMS Customer 3": "+8801712345613",
+}
+
 
 class TestBulkSMS(FrappeTestCase):
-	pass
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		cls.customers = []
+		for customer_name, mobile_no in TEST_CUSTOMERS.items():
+			name = frappe.db.get_value("Customer", {"customer_name": customer_name})
+			if not name:
+				name = frappe.get_doc({
+					"doctype": "Customer",
+					"customer_name": customer_name,
+					"customer_type": "Individual",
+					"mobile_no": mobile_no,
+					"sms_enabled": 1,
+				}).insert(ignore_permissions=True).name
+			cls.customers.append(name)
+
+	def tearDown(self):
+		# Claims commit, so test campaigns are removed explicitly
+		campaigns = frappe.get_all("Bulk SMS", filters={"campaign_name": ["like", "_Test Bulk SMS %"]}, pluck="name")
+		if campaigns:
+			frappe.db.delete("Bulk SMS Shard", {"bulk_sms": ["in", campaigns]})
+			frappe.db.delete("Bulk SMS Recipient", {"bulk_sms": ["in", campaigns]})
+			frappe.db.delete("Bulk SMS", {"name": ["in", campaigns]})
+			frappe.db.commit()
+
+	def make_campaign(self, **kwargs):
+		return frappe.get_doc({
+			"doctype": "Bulk SMS",
+			"campaign_name": f"_Test Bulk SMS {frappe.generate_hash(length=8)}",
+			"message": "Hello {{ customer_name }}",
+			**kwargs
+		}).insert(ignore_permissions=True)
+
+	def test_recipients_are_streamed_on_insert(self):
+		campaign = self.make_campaign(filter_by="Custom Filter",
+			custom_filter=json.dumps({"name": ["in", self.customers]}))
+
+		self.assertEqual(campaign.total_recipients, 3)
+		self.assertEqual(get_recipient_counts(campaign.name), {"Pending": 3})
+
+		[recipients] = list(iter_recipients(campaign.name))
+		self.assertEqual([r.idx for r in recipients], [1, 2, 3])
+		self.assertEqual(sorted(r.customer for r in recipients), sorted(self.customers))
+
+		# Two shards page through their own idx range
+		self.assertEqual([r.idx for r in next(iter_recipients(campaign.name, start_idx=2, end_idx=3))], [2, 3])
+
+	def test_recipients_stay_out_of_the_campaign_document(self):
+		campaign = self.make_campaign(filter_by="Custom Filter",
+			custom_filter=json.dumps({"name": ["in", self.customers]}))
+
+		doc = frappe.get_doc("Bulk SMS", campaign.name)
+		self.assertNotIn("recipients", doc.as_dict())
+
+		# Saving and submitting only count the recipients, they are neither reloaded nor rewritten
+		names = frappe.get_all("Bulk SMS Recipient", filters={"bulk_sms": campaign.name}, pluck="name")
+		doc.scheduled_datetime = "2099-01-01 00:00:00"
+		doc.submit()
+		self.assertEqual(doc.total_recipients, 3)
+		self.assertEqual(sorted(frappe.get_all("Bulk SMS Recipient", filters={"bulk_sms": campaign.name},
+			pluck="name")), sorted(names))
+
+	def test_add_recipients(self):
+		campaign = self.make_campaign()
+		self.assertEqual(campaign.total_recipients, 0)
+
+		campaign.add_recipients(self.customers[:2])
+		result = campaign.add_recipients(self.customers)
+		self.assertEqual(result, {"total_recipients": 3, "added": 1})
+
+		recipients = frappe.get_all("Bulk SMS Recipient", filters={"bulk_sms": campaign.name},
+			fields=["customer", "mobile_no", "idx"], order_by="idx asc")
+		self.assertEqual([r.idx for r in recipients], [1, 2, 3])
+		self.assertEqual({r.mobile_no for r in recipients}, set(TEST_CUSTOMERS.values()))
+		self.assertEqual(frappe.db.get_value("Bulk SMS", campaign.name, "total_recipients"), 3)
+
+	def test_claim_recipients(self):
+		campaign = self.make_campaign(filter_by="Custom Filter",
+			custom_filter=json.dumps({"name": ["in", self.customers]}))
+		shard = frappe.get_doc({
+			"doctype": "Bulk SMS Shard",
+			"bulk_sms": campaign.name,
+			"start_idx": 1,
+			"end_idx": 3,
+			"status": "Processing",
+			"attempts": 2
+		}).insert(ignore_permissions=True)
+		[recipients] = list(iter_recipients(campaign.name))
+
+		# A stale attempt no longer owns the shard and claims nothing
+		self.assertEqual(claim_recipients(frappe._dict(name=shard.name, attempts=1), recipients), [])
+
+		self.assertEqual(claim_recipients(shard, recipients[:2]), recipients[:2])
+		# Rows are claimed once, an overlapping job only gets what is left
+		self.assertEqual(claim_recipients(shard, recipients), recipients[2:])
+		self.assertEqual(get_recipient_counts(campaign.name), {"Sending": 3})
@@ -1,4 +1,57 @@
+import frappe
 from frappe.model.document import Document
 
+from sms_trigger.sms_trigger.utils.phone import INVALID_NUMBER_ERROR, normalize
+
+
 class BulkSMSRecipient(Document):
-	pass
\ No newline at end of file
+	def validate(self):
+		if self.is_new() and frappe.db.get_value("Bulk SMS", self.bulk_sms, "docstatus") != 0:
+			frappe.throw("Recipients can only be added to a draft campaign")
+
+		if not self.mobile_no and self.customer:
+			customer = frappe.db.get_value("Customer", self.customer,
+				["customer_name", "mobile_no", "normalized_mobile_no"], as_dict=True)
+			self.customer_name = self.customer_name or customer.customer_name
+			self.mobile_no = customer.normalized_mobile_no or customer.mobile_no
+
+		mobile_no = normalize(self.mobile_no)
+		if not mobile_no:
+			self.status = "Invalid"
+			self.error_message = INVALID_NUMBER_ERROR
+		else:
+			self.mobile_no = mobile_no
+			if self.status == "Invalid": # Auto-recover if fixed
+				self.status = "Pending"
+				self.error_message = None
+
+	def before_insert(self):
+		# Appended after the campaign's existing rows, shards page through them on idx
+		if not self.idx:
+			self.idx = get_next_idx(self.bulk_sms)
+
+	def after_insert(self):
+		update_total_recipients(self.bulk_sms)
+
+	def on_trash(self):
+		if frappe.db.get_value("Bulk SMS", self.bulk_sms, "docstatus") != 0:
+			frappe.throw("Recipients of a submitted campaign cannot be deleted")
+		update_total_recipients(self.bulk_sms, exclude=self.name)
+
+def get_next_idx(bulk_sms_name):
+	return (frappe.db.sql("""
+		SELECT MAX(idx) FROM `tabBulk SMS Recipient` WHERE bulk_sms = %s
+	""", (bulk_sms_name,))[0][0] or 0) + 1
+
+def update_total_recipients(bulk_sms_name, exclude=None):
+	"""Recount the recipients of a campaign, its form never loads them"""
+	filters = {"bulk_sms": bulk_sms_name}
+	if exclude:
+		filters["name"] = ["!=", exclude]
+	total = frappe.db.count("Bulk SMS Recipient", filters)
+	frappe.db.set_value("Bulk SMS", bulk_sms_name, "total_recipients", total, update_modified=False)
+	return total
+
+def on_doctype_update():
+	"""Recipients are paginated per campaign on idx"""
+	frappe.db.add_index("Bulk SMS Recipient", ["bulk_sms", "idx"])
@@ -1,12 +1,16 @@
 import frappe
 from frappe.model.document import Document
-from frappe.utils import now_datetime
+from frappe.utils import cint
+from sms_trigger.sms_trigger.utils.phone import normalize
 
 class ScheduledSMS(Document):
 	def validate(self):
 		if not self.mobile_no and self.customer:
 			customer = frappe.get_doc("Customer", self.customer)
-			self.mobile_no = customer.mobile_no
+			self.mobile_no = customer.get("normalized_mobile_no") or customer.mobile_no
+
+		# Stored in E.164 so sending only has to pattern check it
+		self.mobile_no = normalize(self.mobile_no) or self.mobile_no
 	
 	def on_submit(self):
 		"""Send SMS when document is submitted"""
@@ -19,20 +23,30 @@ class ScheduledSMS(Document):
 		
 		try:
 			from sms_trigger.sms_trigger.utils.sms_gateway import send_sms
-			result = send_sms(self.mobile_no, self.message)
-			
-			if result.get("success"):
-				self.status = "Sent"
-				self.sent_datetime = now_datetime()
-			else:
-				self.status = "Failed"
-				self.error_message = result.get("error", "Unknown error")
-			
-			self.save(ignore_permissions=True, ignore_version=True)
+			result = send_sms(self.mobile_no, self.message, lane=self.lane or "Bulk")
+			self.set_send_result(result)
 			return result
 			
 		except Exception as e:
 			self.status = "Failed"
 			self.error_message = str(e)
 			self.save(ignore_permissions=True, ignore_version=True)
-			return {"success": False, "error": str(e)}
\ No newline at end of file
+			return {"success": False, "error": str(e)}
+
+	def set_send_result(self, result):
+		"""Record the gateway result for this SMS, scheduling a retry for retryable failures"""
+		from sms_trigger.sms_trigger.utils.retry import get_result_values
+
+		self.update(get_result_values(result, cint(self.attempts) + 1))
+		self.save(ignore_permissions=True, ignore_version=True)
+
+		if self.status == "Sent" and self.reference_doctype == "Bulk SMS Recipient":
+			from sms_trigger.sms_trigger.doctype.bulk_sms.bulk_sms import mark_recipient_retried
+			mark_recipient_retried(self.reference_name, self.sent_datetime)
+
+def on_doctype_update():
+	"""Indexes used by trigger rule dedup and the pending SMS dispatcher"""
+	frappe.db.add_index("Scheduled SMS", ["trigger_type", "scheduled_datetime"])
+	frappe.db.add_index("Scheduled SMS", ["reference_doctype", "reference_name"])
+	frappe.db.add_index("Scheduled SMS", ["status", "lane", "scheduled_datetime"])
+	frappe.db.add_index("Scheduled SMS", ["claim_token"])
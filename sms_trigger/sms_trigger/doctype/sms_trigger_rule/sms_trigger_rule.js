@@ -18,6 +18,10 @@ frappe.ui.form.on('SMS Trigger Rule', {
 				test_rule(frm);
 			}, __('Actions'));
 
+			frm.add_custom_button(__('Dry Run'), function () {
+				dry_run_rule(frm);
+			}, __('Actions'));
+
 			// Validate conditions button
 			if (frm.doc.conditions) {
 				frm.add_custom_button(__('Validate Conditions'), function () {
@@ -32,7 +36,7 @@ frappe.ui.form.on('SMS Trigger Rule', {
 		frm.set_df_property('frequency', 'description',
 			'How often this rule should run. One Time rules run only once per customer.');
 		frm.set_df_property('days_interval', 'description',
-			'For Invoice Due: days overdue. For Inactive Customer: days since last purchase. For Repurchase: days since last purchase of item.');
+			'For Invoice Due: days overdue. For Inactive Customer: days since last purchase. For Repurchase: days since last purchase of item. For Follow-up: days after the last purchase.');
 
 		frm.trigger('show_available_variables');
 	},
@@ -161,6 +165,24 @@ function test_rule(frm) {
 	d.show();
 }
 
+function dry_run_rule(frm) {
+	frappe.call({
+		method: 'sms_trigger.sms_trigger.api.dry_run_sms_rule',
+		args: {
+			rule_name: frm.doc.name
+		},
+		callback: function (r) {
+			if (r.message) {
+				if (r.message.success) {
+					frappe.msgprint(`${r.message.count} customer(s) match the conditions of this rule`);
+				} else {
+					frappe.msgprint('Dry run failed: ' + r.message.error);
+				}
+			}
+		}
+	});
+}
+
 function validate_conditions(frm) {
 	frappe.call({
 		method: 'sms_trigger.sms_trigger.api.validate_sms_conditions',
@@ -195,7 +217,8 @@ function get_default_message(trigger_type) {
 		'Inactive Customer': 'Hi {customer_name}, we miss you! Come back and explore our latest offers.',
 		'Repurchase Promotion': 'Hi {customer_name}, time to reorder {item_code}! Special discount available.',
 		'Customer Type': 'Dear {customer_name}, we have special offers just for you!',
-		'Customer Group': 'Hello {customer_name}, exclusive deals for our valued customers!'
+		'Customer Group': 'Hello {customer_name}, exclusive deals for our valued customers!',
+		'Follow-up': 'Hi {customer_name}, thank you for your recent purchase! We hope you are enjoying it.'
 	};
 	return messages[trigger_type];
 }
@@ -219,6 +242,12 @@ function get_available_variables(trigger_type) {
 			{ name: "item_code", description: "Item Code" },
 			{ name: "last_purchase_date", description: "Date of last purchase" }
 		],
+		'Inactive Customer': [
+			{ name: "last_purchase_date", description: "Date of last purchase" }
+		],
+		'Follow-up': [
+			{ name: "last_purchase_date", description: "Date of last purchase" }
+		],
 		'Reference Document': [
 			{ name: "doc", description: " The Reference Document Object" }
 		]
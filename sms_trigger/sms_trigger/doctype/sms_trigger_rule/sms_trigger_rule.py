@@ -1,6 +1,5 @@
 import frappe
 from frappe.model.document import Document
-import json
 
 class SMSTriggerRule(Document):
 	def validate(self):
@@ -8,13 +7,9 @@ class SMSTriggerRule(Document):
 		self.validate_frequency()
 	
 	def validate_conditions(self):
-		if self.use_json and self.conditions:
-			try:
-				conditions = json.loads(self.conditions)
-				if not isinstance(conditions, dict):
-					frappe.throw("Conditions must be a JSON object")
-			except json.JSONDecodeError:
-				frappe.throw("Invalid JSON format in conditions")
+		from sms_trigger.sms_trigger.utils.conditions import compile_conditions
+		# Throws on malformed JSON, unknown fields and unsupported operators
+		compile_conditions(self)
                 
 		if not self.use_json and not self.condition_table and not self.conditions:
 			# If migrating, we might have data in 'conditions' but 'use_json' is 0. 
@@ -26,6 +21,15 @@ class SMSTriggerRule(Document):
 		if self.frequency in ["Weekly", "Monthly"] and not self.days_interval:
 			frappe.throw(f"Days interval is required for frequency '{self.frequency}'", title="Validation Error", fieldname="days_interval")
 	
+	def on_update(self):
+		from sms_trigger.sms_trigger.utils.conditions import clear_condition_plan
+		from sms_trigger.sms_trigger.utils.template_cache import invalidate_changed_templates
+		invalidate_changed_templates(self, ["message_template"])
+		clear_condition_plan(self.name)
+
+	def on_update_after_submit(self):
+		self.on_update()
+
 	def on_submit(self):
 		"""Activate rule when submitted"""
 		self.is_active = 1
@@ -77,9 +81,14 @@ class SMSTriggerRule(Document):
 		
 		return True
 	
-	def mark_executed(self):
-		"""Mark rule as executed"""
+	def mark_executed(self, duration=None, candidates=None, scheduled=None):
+		"""Mark rule as executed, with the duration and counts of the run"""
 		from frappe.utils import now_datetime
-		self.last_execution = now_datetime()
-		self.execution_count = (self.execution_count or 0) + 1
-		self.save()
\ No newline at end of file
+		# Written directly, the rule is submitted and these fields are not editable after submit
+		self.db_set({
+			"last_execution": now_datetime(),
+			"execution_count": (self.execution_count or 0) + 1,
+			"last_duration": duration,
+			"last_candidate_count": candidates,
+			"last_scheduled_count": scheduled,
+		}, update_modified=False)
@@ -2,4 +2,17 @@ import frappe
 from frappe.model.document import Document
 
 class SMSTriggerSettings(Document):
-	pass
\ No newline at end of file
+	def on_update(self):
+		from sms_trigger.sms_trigger.utils.settings import clear_settings_cache
+		from sms_trigger.sms_trigger.utils.template_cache import invalidate_changed_templates
+		invalidate_changed_templates(self, ["pos_sms_template", "otp_message_template"])
+		clear_settings_cache()
+
+		# Stored customer numbers were normalized with the previous country code
+		if self.has_value_changed("default_country_code"):
+			frappe.enqueue(
+				"sms_trigger.sms_trigger.utils.phone.backfill_customer_mobiles",
+				queue="long",
+				job_id="backfill_customer_mobiles",
+				enqueue_after_commit=True
+			)
@@ -39,6 +39,50 @@ def create_custom_fields():
 				"insert_after": "sms_enabled",
 				"description": "Customer's date of birth for birthday SMS triggers"
 			}).insert(ignore_permissions=True)
+
+		# Mobile number in E.164, kept in sync on save and used for sending
+		if not frappe.db.exists("Custom Field", {"dt": "Customer", "fieldname": "normalized_mobile_no"}):
+			frappe.get_doc({
+				"doctype": "Custom Field",
+				"dt": "Customer",
+				"fieldname": "normalized_mobile_no",
+				"label": "Normalized Mobile No",
+				"fieldtype": "Data",
+				"insert_after": "date_of_birth",
+				"read_only": 1,
+				"no_copy": 1,
+				"search_index": 1,
+				"description": "Mobile number in international format, used for SMS"
+			}).insert(ignore_permissions=True)
+
+		# Month and day of the date of birth (MMDD), indexed for birthday triggers
+		if not frappe.db.exists("Custom Field", {"dt": "Customer", "fieldname": "birth_month_day"}):
+			frappe.get_doc({
+				"doctype": "Custom Field",
+				"dt": "Customer",
+				"fieldname": "birth_month_day",
+				"label": "Birth Month Day",
+				"fieldtype": "Int",
+				"insert_after": "normalized_mobile_no",
+				"hidden": 1,
+				"read_only": 1,
+				"no_copy": 1,
+				"search_index": 1
+			}).insert(ignore_permissions=True)
+
+		# Latest submitted Sales / POS Invoice, indexed for inactivity triggers
+		if not frappe.db.exists("Custom Field", {"dt": "Customer", "fieldname": "last_purchase_date"}):
+			frappe.get_doc({
+				"doctype": "Custom Field",
+				"dt": "Customer",
+				"fieldname": "last_purchase_date",
+				"label": "Last Purchase Date",
+				"fieldtype": "Date",
+				"insert_after": "birth_month_day",
+				"read_only": 1,
+				"no_copy": 1,
+				"search_index": 1
+			}).insert(ignore_permissions=True)
 	except Exception as e:
 		frappe.log_error(f"Error creating custom fields: {str(e)}", "SMS Install Error")
 
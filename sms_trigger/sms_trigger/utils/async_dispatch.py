@@ -0,0 +1,192 @@
+"""asyncio send pipeline for high volume dispatch.
+
+Gateway requests are awaited on one `httpx.AsyncClient`, so a single worker
+keeps hundreds of requests in flight without a thread per request. Everything
+around the request (validation, rate limits, circuit breaker, logs) runs on the
+event loop thread, which owns the site connection.
+
+httpx is optional. Without it, or with async dispatch turned off in SMS Trigger
+Settings, `dispatch.send_grouped` uses the thread pool instead.
+"""
+
+import asyncio
+
+import frappe
+from frappe.utils import cint
+
+from sms_trigger.sms_trigger.utils.lanes import BULK
+from sms_trigger.sms_trigger.utils.settings import get_settings
+
+try:
+	import httpx
+except ImportError:
+	httpx = None
+
+DEFAULT_ASYNC_CONCURRENCY = 200
+
+
+def is_async_enabled():
+	return httpx is not None and cint(get_settings().async_dispatch)
+
+
+def get_async_concurrency():
+	return cint(get_settings().async_concurrency) or DEFAULT_ASYNC_CONCURRENCY
+
+
+def send_requests(requests, concurrency=None, rate=None, lane=BULK):
+	"""Send `(receivers, message)` gateway requests concurrently.
+
+	Returns one result dict per request, in order. At most `concurrency` requests
+	are in flight; the token bucket and the shared rate limits hold new requests
+	back instead of rejecting them.
+	"""
+	results = [None] * len(requests)
+	for idx, result in iter_send_requests(requests, concurrency, rate, lane):
+		results[idx] = result
+	return results
+
+
+def iter_send_requests(requests, concurrency=None, rate=None, lane=BULK, prepare=None):
+	"""Send `(receivers, message)` gateway requests concurrently, yielding `(idx, result)` as each completes.
+
+	The event loop only runs while the caller waits for the next result, so the
+	caller can record progress and renew leases between results on the same
+	thread. Closing the generator early cancels the requests not yet sent.
+
+	`prepare(idx, request)` runs on the loop thread right before request `idx`
+	goes out and returns the `(receivers, message)` to send, or a result dict to
+	answer it without sending.
+	"""
+	if not requests:
+		return
+
+	loop = asyncio.new_event_loop()
+	responses = _send_requests(requests, concurrency or get_async_concurrency(), rate, lane, prepare)
+	try:
+		while True:
+			try:
+				response = loop.run_until_complete(responses.__anext__())
+			except StopAsyncIteration:
+				break
+			yield response
+	finally:
+		loop.run_until_complete(responses.aclose())
+		loop.run_until_complete(loop.shutdown_asyncgens())
+		loop.close()
+
+
+async def _send_requests(requests, concurrency, rate, lane, prepare=None):
+	from sms_trigger.sms_trigger.utils.circuit_breaker import get_gateway_breaker
+	from sms_trigger.sms_trigger.utils.dispatch import get_token_bucket
+	from sms_trigger.sms_trigger.utils.gateway_adapters import CONNECT_TIMEOUT, READ_TIMEOUT, get_adapter
+	from sms_trigger.sms_trigger.utils.lanes import get_lane_rate
+
+	adapter = get_adapter()
+	if not adapter.url:
+		for idx in range(len(requests)):
+			yield idx, {"success": False, "error": "SMS Gateway not configured in SMS Settings"}
+		return
+
+	breaker = get_gateway_breaker(adapter.url)
+	bucket = get_token_bucket(rate or get_lane_rate(lane), lane)
+
+	pending = asyncio.Queue()
+	done = asyncio.Queue()
+	for idx, request in enumerate(requests):
+		pending.put_nowait((idx, request))
+
+	limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+	timeout = httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT)
+	async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+
+		async def worker():
+			while not pending.empty():
+				idx, request = pending.get_nowait()
+				if prepare:
+					try:
+						request = prepare(idx, request)
+					except Exception as e:
+						request = {"success": False, "error": str(e)}
+					if isinstance(request, dict):
+						done.put_nowait((idx, request))
+						continue
+
+				receivers, message = request
+				done.put_nowait((idx, await _send(client, adapter, breaker, bucket, receivers, message, lane)))
+
+		workers = [asyncio.ensure_future(worker()) for _ in range(min(concurrency, len(requests)))]
+		try:
+			for _ in requests:
+				yield await done.get()
+		finally:
+			for task in workers:
+				task.cancel()
+			await asyncio.gather(*workers, return_exceptions=True)
+
+
+async def _send(client, adapter, breaker, bucket, receivers, message, lane):
+	from sms_trigger.sms_trigger.utils.rate_limiter import acquire_gateway_capacity_async
+	from sms_trigger.sms_trigger.utils.sms_gateway import CIRCUIT_OPEN_RESULT, get_status_result
+
+	try:
+		if not breaker.allow_request():
+			return CIRCUIT_OPEN_RESULT.copy()
+
+		await asyncio.sleep(bucket.reserve(len(receivers)))
+		limit_error = await acquire_gateway_capacity_async(len(receivers), adapter.url, lane=lane)
+		if limit_error:
+			return {"success": False, "error": limit_error, "retryable": True}
+
+		status = await adapter.send_async(client, receivers, message)
+		return get_status_result(status, breaker, receivers)
+
+	except httpx.HTTPError as e:
+		breaker.record_failure()
+		error_msg = f"Network or API error: {e}"
+		frappe.log_error(f"SMS sending failed: {error_msg}", "SMS Gateway Error")
+		return {"success": False, "error": error_msg, "retryable": True}
+	except Exception as e:
+		error_msg = str(e)
+		frappe.log_error(f"SMS sending failed: {error_msg}", "SMS Gateway Error")
+		return {"success": False, "error": error_msg}
+
+
+def send_grouped_async(chunks, get_mobile_no, lane=BULK, before_send=None):
+	"""`dispatch.send_grouped` on the asyncio pipeline, every chunk becomes one gateway request.
+
+	Chunks are yielded as their request completes, so the caller flushes progress
+	and heartbeats while the rest of the page is still in flight. Each chunk is
+	claimed through `before_send` and validated only when its request is next.
+	"""
+	from sms_trigger.sms_trigger.utils.dispatch import SKIPPED_RESULT, align_results, claim_items
+	from sms_trigger.sms_trigger.utils.sms_gateway import log_sent_sms, prepare_receivers, release_rate_limit
+
+	chunks = list(chunks)
+	prepared = {}
+
+	def prepare(idx, chunk):
+		message, items = chunk
+		claimed = claim_items(items, before_send)
+		message, results, sendable = prepare_receivers([get_mobile_no(item) for item in claimed], message)
+		prepared[idx] = (message, claimed, results, sendable)
+		if not sendable:
+			# Nothing to send, every claimed item already has its result
+			return {"success": False, "error": "No sendable receivers"}
+		return [cleaned for idx, cleaned in sendable], message
+
+	for chunk_idx, result in iter_send_requests(chunks, lane=lane, prepare=prepare):
+		message, items = chunks[chunk_idx]
+		if chunk_idx not in prepared:
+			# The claim itself failed, nothing of the chunk was sent
+			yield (message, items), [SKIPPED_RESULT.copy() for _ in items]
+			continue
+
+		message, claimed, results, sendable = prepared.pop(chunk_idx)
+		if sendable and result.get("success"):
+			log_sent_sms(message, [cleaned for idx, cleaned in sendable])
+		for idx, cleaned in sendable:
+			if not result.get("success"):
+				release_rate_limit(cleaned)
+			results[idx] = dict(result)
+
+		yield (message, items), align_results(items, claimed, results)
@@ -0,0 +1,184 @@
+"""Benchmarks for the SMS Trigger hot paths.
+
+Run them on a disposable site, every benchmark rolls back the data it seeds:
+
+	bench --site test_site execute sms_trigger.sms_trigger.utils.benchmarks.benchmark_trigger_dedup --kwargs "{'customers': 100000}"
+	bench --site test_site execute sms_trigger.sms_trigger.utils.benchmarks.benchmark_gateway_throughput --kwargs "{'messages': 1000}"
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import frappe
+from frappe.utils import add_days, getdate, now_datetime
+
+BENCH_PREFIX = "BENCH-CUST-"
+
+
+@contextmanager
+def measure():
+	"""Count queries sent through frappe.db.sql and time the block"""
+	stats = {"queries": 0, "seconds": 0}
+	original_sql = frappe.db.sql
+
+	def sql(*args, **kwargs):
+		stats["queries"] += 1
+		return original_sql(*args, **kwargs)
+
+	frappe.db.sql = sql
+	start = time.perf_counter()
+	try:
+		yield stats
+	finally:
+		stats["seconds"] = round(time.perf_counter() - start, 3)
+		frappe.db.sql = original_sql
+
+
+def seed_customers(count, scheduled_ratio=0.1, trigger_type="Customer Group"):
+	"""Insert `count` bare customers and give a share of them an existing Scheduled SMS"""
+	from frappe.model.naming import make_autoname
+
+	now = now_datetime()
+	names = [f"{BENCH_PREFIX}{i:07d}" for i in range(count)]
+	frappe.db.bulk_insert(
+		"Customer",
+		["name", "customer_name", "customer_type", "mobile_no", "sms_enabled", "creation", "modified"],
+		[(name, name, "Individual", f"88017{i:08d}", 1, now, now) for i, name in enumerate(names)],
+	)
+
+	every = int(1 / scheduled_ratio) if scheduled_ratio else 0
+	if every:
+		frappe.db.bulk_insert(
+			"Scheduled SMS",
+			["name", "customer", "mobile_no", "message", "trigger_type", "scheduled_datetime", "docstatus", "status", "creation", "modified"],
+			[
+				(make_autoname("hash", "Scheduled SMS"), name, "8801700000000", "bench", trigger_type, now, 1, "Sent", now, now)
+				for name in names[::every]
+			],
+		)
+
+	return [frappe._dict(name=name) for name in names]
+
+
+def legacy_dedup(candidates, trigger_type, since):
+	"""Per-candidate exists() check used before set based dedup"""
+	return [
+		c for c in candidates
+		if not frappe.db.exists("Scheduled SMS", {
+			"customer": c.name,
+			"trigger_type": trigger_type,
+			"scheduled_datetime": [">=", since]
+		})
+	]
+
+
+def set_dedup(candidates, trigger_type, since):
+	from sms_trigger.sms_trigger.utils.trigger_engine import get_scheduled_customers
+
+	scheduled = get_scheduled_customers(trigger_type, since)
+	return [c for c in candidates if c.name not in scheduled]
+
+
+def benchmark_trigger_dedup(customers=100000, scheduled_ratio=0.1):
+	"""Compare query count and runtime of per-customer exists() dedup with the set based prefetch"""
+	trigger_type = "Customer Group"
+	since = add_days(getdate(), -30)
+
+	try:
+		candidates = seed_customers(int(customers), float(scheduled_ratio), trigger_type)
+
+		with measure() as before:
+			legacy = legacy_dedup(candidates, trigger_type, since)
+
+		with measure() as after:
+			current = set_dedup(candidates, trigger_type, since)
+
+		assert len(legacy) == len(current), "Dedup strategies disagree"
+
+		result = {
+			"customers": len(candidates),
+			"to_schedule": len(current),
+			"before": before,
+			"after": after,
+		}
+		print(f"Dedup of {len(candidates)} candidates ({len(current)} to schedule)")
+		print(f"  exists() per customer: {before['queries']} queries, {before['seconds']}s")
+		print(f"  prefetched key set:    {after['queries']} queries, {after['seconds']}s")
+		return result
+	finally:
+		frappe.db.rollback()
+
+
+class MockGatewayHandler(BaseHTTPRequestHandler):
+	"""Stand-in SMS gateway, answers every request with 200 after `latency` seconds"""
+
+	protocol_version = "HTTP/1.1"
+	latency = 0
+
+	def _respond(self):
+		length = int(self.headers.get("Content-Length") or 0)
+		if length:
+			self.rfile.read(length)
+		if self.latency:
+			time.sleep(self.latency)
+		self.send_response(200)
+		self.send_header("Content-Length", "2")
+		self.end_headers()
+		self.wfile.write(b"OK")
+
+	do_GET = _respond
+	do_POST = _respond
+
+	def log_message(self, *args):
+		pass
+
+
+@contextmanager
+def mock_gateway_server(latency=0):
+	"""Run a stand-in gateway on a free local port, yields its URL"""
+	handler = type("Handler", (MockGatewayHandler,), {"latency": latency})
+	server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+	thread = threading.Thread(target=server.serve_forever, daemon=True)
+	thread.start()
+	try:
+		yield f"http://127.0.0.1:{server.server_port}/sms"
+	finally:
+		server.shutdown()
+		server.server_close()
+
+
+def benchmark_gateway_throughput(messages=1000, latency=0.0):
+	"""Compare a fresh requests call per message with the pooled adapter session against a stand-in gateway"""
+	import requests
+
+	from sms_trigger.sms_trigger.utils.gateway_adapters import SMSSettingsAdapter
+
+	messages = int(messages)
+	with mock_gateway_server(float(latency)) as url:
+		config = frappe._dict(
+			url=url, use_post=1, use_json=False, headers={}, params={},
+			message_parameter="message", receiver_parameter="to"
+		)
+		adapter = SMSSettingsAdapter(config)
+
+		start = time.perf_counter()
+		for i in range(messages):
+			requests.post(url, data={"message": "bench", "to": f"88017{i:08d}"}, timeout=30)
+		fresh = time.perf_counter() - start
+
+		start = time.perf_counter()
+		for i in range(messages):
+			adapter.send([f"88017{i:08d}"], "bench")
+		pooled = time.perf_counter() - start
+
+	result = {
+		"messages": messages,
+		"fresh_per_second": round(messages / fresh, 1),
+		"pooled_per_second": round(messages / pooled, 1),
+	}
+	print(f"{messages} sends against a stand-in gateway")
+	print(f"  new connection per send: {result['fresh_per_second']}/s")
+	print(f"  pooled keep-alive session: {result['pooled_per_second']}/s")
+	return result
@@ -0,0 +1,80 @@
+"""Birthday lookups on a precomputed month-day key.
+
+Customers keep `birth_month_day` (month * 100 + day, e.g. 1231) next to
+`date_of_birth`. The column is indexed, so a day or a window of days is a
+range scan instead of a DATE_FORMAT over every customer.
+"""
+
+import calendar
+
+import frappe
+from frappe.utils import add_days, getdate
+
+# Catch up at most this many missed daily runs
+MAX_CATCH_UP_DAYS = 7
+
+
+def get_month_day(date):
+	date = getdate(date)
+	return date.month * 100 + date.day
+
+
+def set_birth_month_day(doc, method=None):
+	"""Keep the month-day key of a customer in sync (Customer validate)"""
+	if doc.meta.has_field("birth_month_day"):
+		doc.birth_month_day = get_month_day(doc.date_of_birth) if doc.get("date_of_birth") else 0
+
+
+def get_month_day_ranges(start_date, end_date):
+	"""Inclusive `(from, to)` key ranges covering the days from `start_date` to `end_date`.
+
+	A window over the new year is split in two. Feb 29 birthdays are included
+	on Feb 28 in non-leap years.
+	"""
+	start_date, end_date = getdate(start_date), getdate(end_date)
+	if (end_date - start_date).days >= 365:
+		return [(101, 1231)]
+
+	start, end = get_month_day(start_date), get_month_day(end_date)
+	if end == 228 and not calendar.isleap(end_date.year):
+		end = 229
+
+	if start <= end:
+		return [(start, end)]
+	return [(start, 1231), (101, end)]
+
+
+def get_birthday_window(rule, today=None):
+	"""Dates whose birthdays a run of `rule` handles: `days_before` ahead, plus days missed since the last run"""
+	today = getdate(today)
+	start = today
+	if rule.last_execution:
+		start = max(add_days(getdate(rule.last_execution), 1), add_days(today, -MAX_CATCH_UP_DAYS + 1))
+		start = min(start, today)
+
+	days_before = rule.days_before or 0
+	return add_days(start, days_before), add_days(today, days_before), start
+
+
+def get_birthday_customers(start_date, end_date, plan=None):
+	"""SMS-enabled customers with a birthday from `start_date` to `end_date`, narrowed by a condition plan"""
+	conditions, values = plan.get_sql("c") if plan else ("", {})
+	customers = []
+	for low, high in get_month_day_ranges(start_date, end_date):
+		customers += frappe.db.sql(f"""
+			SELECT c.name AS customer, c.customer_name, c.normalized_mobile_no AS mobile_no, c.date_of_birth
+			FROM `tabCustomer` c
+			WHERE c.birth_month_day BETWEEN %(low)s AND %(high)s
+			AND IFNULL(c.normalized_mobile_no, '') != ''
+			AND IFNULL(c.sms_enabled, 1) = 1
+			{conditions}
+		""", {**values, "low": low, "high": high}, as_dict=True)
+	return customers
+
+
+def backfill_birth_month_day():
+	frappe.db.sql("""
+		UPDATE `tabCustomer`
+		SET birth_month_day = MONTH(date_of_birth) * 100 + DAYOFMONTH(date_of_birth)
+		WHERE date_of_birth IS NOT NULL
+	""")
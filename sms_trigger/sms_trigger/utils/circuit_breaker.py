@@ -0,0 +1,99 @@
+import time
+
+import frappe
+from frappe.utils import cint, flt
+
+CIRCUIT_PREFIX = "sms_circuit"
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 60
+
+
+class CircuitBreaker:
+	"""Circuit breaker whose state lives in the site cache, shared by all workers.
+
+	Consecutive failures within `reset_timeout` open the circuit and calls fail
+	fast. Once `reset_timeout` has passed the circuit is half open: a single
+	caller is let through as a probe, its success closes the circuit and its
+	failure opens it for another period.
+	"""
+
+	def __init__(self, name, failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT):
+		self.name = name
+		self.failure_threshold = cint(failure_threshold) or DEFAULT_FAILURE_THRESHOLD
+		self.reset_timeout = cint(reset_timeout) or DEFAULT_RESET_TIMEOUT
+
+	def _key(self, suffix):
+		return frappe.cache().make_key(f"{CIRCUIT_PREFIX}:{self.name}:{suffix}")
+
+	def _opened_at(self):
+		return flt(frappe.cache().get(self._key("opened_at")))
+
+	def get_state(self):
+		opened_at = self._opened_at()
+		if not opened_at:
+			return CLOSED
+		if time.time() - opened_at < self.reset_timeout:
+			return OPEN
+		return HALF_OPEN
+
+	def allow_request(self):
+		"""Whether a call may go to the gateway now"""
+		state = self.get_state()
+		if state == CLOSED:
+			return True
+		if state == OPEN:
+			return False
+		# Half open, only the caller that wins the probe slot goes through
+		return bool(frappe.cache().set(self._key("probe"), 1, nx=True, ex=self.reset_timeout))
+
+	def record_success(self):
+		frappe.cache().delete(self._key("failures"), self._key("opened_at"), self._key("probe"))
+
+	def record_failure(self):
+		cache = frappe.cache()
+		if self._opened_at():
+			# A failed probe keeps the circuit open for another period
+			self._open()
+			return
+
+		failures_key = self._key("failures")
+		pipe = cache.pipeline()
+		pipe.incr(failures_key)
+		pipe.expire(failures_key, self.reset_timeout)
+		failures, _ = pipe.execute()
+		if cint(failures) >= self.failure_threshold:
+			self._open()
+
+	def _open(self):
+		pipe = frappe.cache().pipeline()
+		pipe.set(self._key("opened_at"), time.time())
+		pipe.delete(self._key("failures"), self._key("probe"))
+		pipe.execute()
+
+	def get_status(self):
+		opened_at = self._opened_at()
+		return {
+			"state": self.get_state(),
+			"failures": cint(frappe.cache().get(self._key("failures"))),
+			"failure_threshold": self.failure_threshold,
+			"opened_at": opened_at or None,
+			"retry_in": max(0, round(opened_at + self.reset_timeout - time.time())) if opened_at else 0,
+		}
+
+
+def get_gateway_breaker(gateway_url=None):
+	"""Circuit breaker for the gateway at `gateway_url` (the configured one by default)"""
+	from sms_trigger.sms_trigger.utils.rate_limiter import get_gateway_key
+	from sms_trigger.sms_trigger.utils.settings import get_settings
+
+	settings = get_settings()
+	return CircuitBreaker(
+		get_gateway_key(gateway_url),
+		settings.circuit_failure_threshold,
+		settings.circuit_reset_timeout,
+	)
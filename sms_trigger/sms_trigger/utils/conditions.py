@@ -0,0 +1,140 @@
+"""Compiled SMS Trigger Rule conditions.
+
+The condition table or the JSON conditions of a rule are parsed and
+validated once into a `ConditionPlan`: Customer filters with mapped
+operators, plus rule parameters such as `item_code` that are not Customer
+fields. Plans are cached per process and invalidated when the rule is saved.
+"""
+
+import json
+import threading
+
+import frappe
+from frappe.utils import cstr
+
+# SMS Trigger Condition operator -> query operator
+OPERATORS = {
+	"Equals": "=",
+	"Not Equals": "!=",
+	"Greater Than": ">",
+	"Less Than": "<",
+	"Greater Than or Equal To": ">=",
+	"Less Than or Equal To": "<=",
+	"Like": "like",
+	"In": "in",
+}
+SQL_OPERATORS = {"=": "=", "!=": "!=", ">": ">", "<": "<", ">=": ">=", "<=": "<=", "like": "LIKE", "in": "IN"}
+
+# Condition keys that parametrize a trigger type instead of filtering customers
+RULE_PARAMETERS = ("item_code",)
+
+# (site, rule name) -> (rule modified, plan)
+_plans = {}
+_lock = threading.Lock()
+
+
+class ConditionPlan:
+	"""Validated Customer filters and parameters of a rule"""
+
+	def __init__(self, filters=None, params=None):
+		self.filters = tuple(filters or ())
+		self.params = frappe._dict(params or {})
+
+	def get_filters(self):
+		"""Filters for frappe.get_all on Customer"""
+		return [list(f) for f in self.filters]
+
+	def get_sql(self, alias="c"):
+		"""`(condition, values)` to append to a query on `tabCustomer` as `alias`, with bound values"""
+		conditions, values = [], {}
+		for idx, (field, operator, value) in enumerate(self.filters):
+			key = f"cond_{idx}"
+			# Tuples are bound as a parenthesized list for IN
+			conditions.append(f"{alias}.`{field}` {SQL_OPERATORS[operator]} %({key})s")
+			values[key] = value
+		return "".join(f" AND {c}" for c in conditions), values
+
+
+def get_condition_plan(rule):
+	"""Compiled conditions of `rule`, compiled once per rule version"""
+	key = (frappe.local.site, rule.name)
+	with _lock:
+		cached = _plans.get(key)
+	if cached and rule.name and cached[0] == cstr(rule.modified):
+		return cached[1]
+
+	plan = compile_conditions(rule)
+	if rule.name:
+		with _lock:
+			_plans[key] = (cstr(rule.modified), plan)
+	return plan
+
+
+def clear_condition_plan(rule_name):
+	with _lock:
+		_plans.pop((frappe.local.site, rule_name), None)
+
+
+def compile_conditions(rule):
+	"""Parse and validate the condition table or JSON of `rule`, throws on invalid conditions"""
+	if not rule.use_json and rule.condition_table:
+		conditions = [(row.field, row.operator, row.value) for row in rule.condition_table]
+	elif rule.conditions:
+		conditions = parse_json_conditions(rule.conditions)
+	else:
+		conditions = []
+
+	meta = frappe.get_meta("Customer")
+	valid_fields = set(meta.get_valid_columns()) | {"name"}
+
+	filters, params = [], {}
+	for field, operator, value in conditions:
+		field = cstr(field).strip()
+		operator = OPERATORS.get(operator, cstr(operator).strip().lower())
+		if operator not in SQL_OPERATORS:
+			frappe.throw(f"Unsupported operator '{operator}' for condition on '{field}'", title="Invalid Condition")
+
+		if field in RULE_PARAMETERS:
+			if operator != "=":
+				frappe.throw(f"'{field}' only supports Equals", title="Invalid Condition")
+			params[field] = value
+			continue
+
+		if field not in valid_fields:
+			frappe.throw(f"'{field}' is not a Customer field", title="Invalid Condition")
+
+		if operator == "in":
+			if isinstance(value, str):
+				value = [v.strip() for v in value.split(",") if v.strip()]
+			if not value:
+				frappe.throw(f"'{field}' In needs at least one value", title="Invalid Condition")
+			value = tuple(value)
+
+		filters.append((field, operator, value))
+
+	return ConditionPlan(filters, params)
+
+
+def parse_json_conditions(conditions):
+	"""`{"field": value}` or `{"field": [operator, value]}` as (field, operator, value) triples"""
+	try:
+		parsed = json.loads(conditions) if isinstance(conditions, str) else conditions
+	except json.JSONDecodeError:
+		frappe.throw("Invalid JSON format in conditions", title="Invalid Condition")
+
+	if not isinstance(parsed, dict):
+		frappe.throw("Conditions must be a JSON object", title="Invalid Condition")
+
+	triples = []
+	for field, value in parsed.items():
+		if isinstance(value, (list, tuple)) and len(value) == 2 and is_operator(value[0]):
+			triples.append((field, value[0], value[1]))
+		elif isinstance(value, (list, tuple)):
+			triples.append((field, "in", value))
+		else:
+			triples.append((field, "=", value))
+	return triples
+
+
+def is_operator(value):
+	return isinstance(value, str) and (value in OPERATORS or value.strip().lower() in SQL_OPERATORS)
@@ -0,0 +1,227 @@
+import queue
+import threading
+import time
+
+import frappe
+from frappe.utils import cint, flt
+
+from sms_trigger.sms_trigger.utils.lanes import BULK
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_RATE_PER_SECOND = 5
+
+# Result of items that another sender claimed first, the caller leaves them alone
+SKIPPED_RESULT = {"success": False, "error": "Claimed by another sender", "skipped": True}
+
+# Redis key prefix of the shared token buckets
+BUCKET_PREFIX = "sms_token_bucket"
+
+# Moves the bucket's theoretical arrival time forward by the cost of a request
+# and returns how long the caller has to wait, on the Redis clock
+RESERVE_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if not tat or tat < now then
+	tat = now
+end
+tat = tat + tonumber(ARGV[1])
+redis.call('SET', KEYS[1], tostring(tat), 'EX', math.ceil(tat - now) + 60)
+return tostring(math.max(0, tat - now - tonumber(ARGV[2])))
+"""
+
+
+class TokenBucket:
+	"""Token bucket shared by every worker of the site through the Redis cache.
+
+	RQ runs each job in its own work-horse process, so the bucket cannot live in
+	memory. It is kept as a theoretical arrival time instead (GCRA): a request of
+	`tokens` pushes it forward by `tokens / rate` seconds, and the caller waits for
+	as long as it runs more than a full bucket ahead. One script call per request.
+	"""
+
+	def __init__(self, rate, capacity=None, key="default"):
+		self.rate = flt(rate)
+		self.capacity = flt(capacity) or max(self.rate, 1)
+		self.key = key
+
+	def acquire(self, tokens=1):
+		"""Block until `tokens` are available and consume them"""
+		wait = self.reserve(tokens)
+		if wait:
+			time.sleep(wait)
+
+	def reserve(self, tokens=1):
+		"""Take `tokens` right away and return how many seconds the caller should wait before using them"""
+		if self.rate <= 0:
+			return 0
+
+		cache = frappe.cache()
+		wait = cache.register_script(RESERVE_SCRIPT)(
+			keys=[cache.make_key(f"{BUCKET_PREFIX}:{self.key}")],
+			args=[flt(tokens) / self.rate, self.capacity / self.rate]
+		)
+		return flt(frappe.safe_decode(wait))
+
+
+def get_token_bucket(rate, lane=None):
+	"""Return the site-wide bucket of `lane`, shared by every campaign and drain job"""
+	return TokenBucket(rate, key=lane or "default")
+
+
+def get_dispatch_settings():
+	"""Read concurrency and throughput limits from SMS Trigger Settings"""
+	from sms_trigger.sms_trigger.utils.settings import get_settings
+
+	settings = get_settings()
+	return {
+		"concurrency": cint(settings.bulk_sms_concurrency) or DEFAULT_CONCURRENCY,
+		"rate": flt(settings.sms_rate_limit_per_second) or DEFAULT_RATE_PER_SECOND,
+	}
+
+
+def dispatch(jobs, send, concurrency=None, rate=None, weight=None, lane=None):
+	"""Run `send(job)` for every job and yield `(job, result)` as each one finishes.
+
+	Sends run on a pool of `concurrency` threads, each with its own site connection,
+	and are throttled by a shared token bucket of `rate` messages per second. A job
+	carrying several messages (a batched gateway request) takes `weight(job)` tokens.
+	Results are yielded back on the calling thread, which stays the only one touching
+	the caller's documents.
+	"""
+	if concurrency is None or rate is None:
+		settings = get_dispatch_settings()
+		concurrency = settings["concurrency"] if concurrency is None else concurrency
+		rate = settings["rate"] if rate is None else rate
+
+	bucket = get_token_bucket(rate, lane)
+	weight = weight or (lambda job: 1)
+	jobs = list(jobs)
+	concurrency = max(1, min(cint(concurrency), len(jobs)))
+
+	if concurrency == 1:
+		for job in jobs:
+			bucket.acquire(weight(job))
+			yield job, _safe_send(send, job)
+		return
+
+	site = frappe.local.site
+	pending = queue.Queue()
+	results = queue.Queue()
+	for job in jobs:
+		pending.put(job)
+
+	def worker():
+		try:
+			frappe.init(site=site)
+			frappe.connect()
+			while True:
+				try:
+					job = pending.get_nowait()
+				except queue.Empty:
+					break
+				bucket.acquire(weight(job))
+				result = _safe_send(send, job)
+				frappe.db.commit()
+				results.put((job, result))
+		finally:
+			if getattr(frappe.local, "site", None):
+				frappe.destroy()
+			results.put(None)
+
+	threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+	for thread in threads:
+		thread.start()
+
+	try:
+		running = len(threads)
+		while running:
+			item = results.get()
+			if item is None:
+				running -= 1
+				continue
+			yield item
+
+		# Jobs left behind by workers that failed to connect
+		while not pending.empty():
+			yield pending.get_nowait(), {"success": False, "error": "Dispatch worker could not connect to site"}
+	finally:
+		# The caller stopped early (lost its shard, raised): send nothing more and
+		# wait for the requests already in flight, their results are dropped
+		while True:
+			try:
+				pending.get_nowait()
+			except queue.Empty:
+				break
+		for thread in threads:
+			thread.join()
+
+
+def claim_items(items, before_send):
+	"""The items of a chunk this sender may send, as claimed by `before_send`"""
+	if not before_send:
+		return items
+
+	try:
+		return before_send(items)
+	except Exception as e:
+		# Nothing was claimed, the rows are left for the next attempt
+		frappe.db.rollback()
+		frappe.log_error(f"Could not claim {len(items)} messages before sending: {e}", "SMS Send Error")
+		return []
+
+
+def align_results(items, claimed, results):
+	"""Spread the results of the claimed items over the whole chunk"""
+	by_item = {id(item): result for item, result in zip(claimed, results, strict=True)}
+	return [by_item.get(id(item)) or SKIPPED_RESULT.copy() for item in items]
+
+
+def send_grouped(chunks, get_mobile_no, lane=BULK, before_send=None):
+	"""Send `(message, items)` chunks from `group_by_message`, yielding `((message, items), results)`.
+
+	`results` holds one result per item. Chunks go through the asyncio pipeline
+	when it is enabled and httpx is installed, through the thread pool otherwise,
+	throttled to the rate of `lane`.
+
+	`before_send(items)` is called right before the gateway request of a chunk
+	and returns the items that may be sent, so a caller can claim its rows one
+	request at a time. The others get `SKIPPED_RESULT`.
+	"""
+	from sms_trigger.sms_trigger.utils.async_dispatch import is_async_enabled, send_grouped_async
+	from sms_trigger.sms_trigger.utils.lanes import get_lane_rate
+	from sms_trigger.sms_trigger.utils.sms_gateway import send_sms_batch
+
+	if is_async_enabled():
+		yield from send_grouped_async(chunks, get_mobile_no, lane, before_send)
+		return
+
+	def send(chunk):
+		message, items = chunk
+		claimed = claim_items(items, before_send)
+		if not claimed:
+			return [SKIPPED_RESULT.copy() for _ in items]
+		# Only the claimed items may be reported as failed
+		try:
+			results = send_sms_batch([get_mobile_no(item) for item in claimed], message, lane=lane)
+		except Exception as e:
+			results = [{"success": False, "error": str(e)}] * len(claimed)
+		return align_results(items, claimed, results)
+
+	for (message, items), results in dispatch(
+		chunks,
+		send,
+		rate=get_lane_rate(lane),
+		weight=lambda c: len(c[1]),
+		lane=lane
+	):
+		if isinstance(results, dict):
+			results = [results] * len(items)
+		yield (message, items), results
+
+
+def _safe_send(send, job):
+	try:
+		return send(job)
+	except Exception as e:
+		return {"success": False, "error": str(e)}
@@ -1,7 +1,9 @@
-import frappe
-from frappe.utils import now_datetime, cstr
 import traceback
 
+import frappe
+from frappe.utils import add_days, cstr, now_datetime
+
+
 class SMSErrorHandler:
 	"""Centralized error handling for SMS Trigger app"""
 	
@@ -127,6 +129,17 @@ def get_sms_health_check():
 			"message": sms_validation.get("error", "SMS settings configured properly")
 		})
 		
+		# Check gateway circuit breaker
+		from sms_trigger.sms_trigger.utils.circuit_breaker import HALF_OPEN, OPEN, get_gateway_breaker
+		circuit = get_gateway_breaker().get_status()
+		health_status["checks"].append({
+			"check": "Gateway Circuit",
+			"status": "Fail" if circuit["state"] == OPEN else "Warning" if circuit["state"] == HALF_OPEN else "Pass",
+			"message": f"Circuit {circuit['state'].replace('_', ' ')}, retry in {circuit['retry_in']}s"
+				if circuit["state"] == OPEN else f"Circuit {circuit['state'].replace('_', ' ')}, {circuit['failures']} recent failures",
+			"circuit": circuit
+		})
+
 		# Check active rules
 		active_rules = frappe.db.count("SMS Trigger Rule", {"is_active": 1})
 		health_status["checks"].append({
@@ -0,0 +1,162 @@
+"""Gateway adapters that deliver a message to a list of receivers.
+
+Adapters are looked up by the name set in SMS Trigger Settings. Apps can add
+their own through the `sms_gateway_adapters` hook:
+
+	sms_gateway_adapters = {"My Provider": "my_app.sms.MyProviderAdapter"}
+"""
+
+import threading
+import time
+
+import frappe
+import requests
+from frappe.utils import cint, cstr, flt
+
+# Seconds to wait for the connection and for the response
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 30
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+	"""Process wide HTTP session, connections to the gateway are kept alive and reused"""
+	global _session
+	if _session is None:
+		with _session_lock:
+			if _session is None:
+				from requests.adapters import HTTPAdapter
+
+				from sms_trigger.sms_trigger.utils.dispatch import get_dispatch_settings
+
+				# Enough pooled connections for every concurrent sender of the worker
+				pool_size = max(10, cint(get_dispatch_settings()["concurrency"]) * 2)
+				session = requests.Session()
+				adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+				session.mount("http://", adapter)
+				session.mount("https://", adapter)
+				_session = session
+	return _session
+
+
+def build_gateway_config():
+	"""Everything needed to call the gateway configured in SMS Settings"""
+	from frappe.core.doctype.sms_settings.sms_settings import get_headers
+
+	sms_settings = frappe.get_doc("SMS Settings")
+	headers = get_headers(sms_settings)
+	return {
+		"url": sms_settings.sms_gateway_url,
+		"use_post": cint(sms_settings.use_post),
+		"use_json": headers.get("Content-Type") == "application/json",
+		"headers": headers,
+		"params": {d.parameter: d.value for d in sms_settings.get("parameters") if not d.header},
+		"message_parameter": sms_settings.message_parameter,
+		"receiver_parameter": sms_settings.receiver_parameter,
+	}
+
+
+def get_gateway_config():
+	"""Gateway configuration from the settings snapshot, cached until SMS Settings are saved"""
+	from sms_trigger.sms_trigger.utils.settings import get_settings
+
+	return get_settings().gateway
+
+
+class GatewayAdapter:
+	"""Base class, `send` delivers one message to many receivers and returns the HTTP status"""
+
+	def __init__(self, config):
+		self.config = config
+
+	@property
+	def url(self):
+		return self.config.get("url")
+
+	def send(self, receivers, message):
+		raise NotImplementedError
+
+	async def send_async(self, client, receivers, message):
+		"""Send from the asyncio pipeline with the shared `httpx.AsyncClient`.
+
+		The default runs `send` in a thread, adapters override it to await the
+		request on `client` instead.
+		"""
+		import asyncio
+
+		return await asyncio.to_thread(self.send, receivers, message)
+
+
+class SMSSettingsAdapter(GatewayAdapter):
+	"""Generic HTTP gateway described by SMS Settings, sent over the pooled session"""
+
+	def get_request(self, receivers, message):
+		"""HTTP method and keyword arguments of the request, valid for requests and httpx"""
+		config = self.config
+		params = dict(config.params)
+		params[config.message_parameter] = cstr(message)
+		params[config.receiver_parameter] = ",".join(receivers)
+
+		if not config.use_post:
+			return "GET", {"headers": config.headers, "params": params}
+		if config.use_json:
+			return "POST", {"headers": config.headers, "json": params}
+		return "POST", {"headers": config.headers, "data": params}
+
+	def send(self, receivers, message):
+		method, kwargs = self.get_request(receivers, message)
+		response = get_session().request(method, self.url, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), **kwargs)
+		return response.status_code
+
+	async def send_async(self, client, receivers, message):
+		method, kwargs = self.get_request(receivers, message)
+		response = await client.request(method, self.url, **kwargs)
+		return response.status_code
+
+
+class MockAdapter(GatewayAdapter):
+	"""Stand-in gateway that never leaves the process.
+
+	Waits `sms_mock_gateway_latency` seconds (site config) per request and
+	accepts every message, for benchmarking everything in front of the gateway.
+	"""
+
+	@property
+	def url(self):
+		return "mock://sms-gateway"
+
+	def send(self, receivers, message):
+		latency = flt(frappe.conf.get("sms_mock_gateway_latency"))
+		if latency:
+			time.sleep(latency)
+		return 200
+
+	async def send_async(self, client, receivers, message):
+		import asyncio
+
+		await asyncio.sleep(flt(frappe.conf.get("sms_mock_gateway_latency")))
+		return 200
+
+
+ADAPTERS = {
+	"SMS Settings": "sms_trigger.sms_trigger.utils.gateway_adapters.SMSSettingsAdapter",
+	"Mock": "sms_trigger.sms_trigger.utils.gateway_adapters.MockAdapter",
+}
+
+
+def get_adapter(name=None):
+	"""Adapter instance for `name`, the one selected in SMS Trigger Settings by default"""
+	from sms_trigger.sms_trigger.utils.settings import get_settings
+
+	name = name or get_settings().gateway_adapter or "SMS Settings"
+
+	adapters = dict(ADAPTERS)
+	for adapter_name, paths in (frappe.get_hooks("sms_gateway_adapters") or {}).items():
+		adapters[adapter_name] = paths[-1]
+
+	if name not in adapters:
+		frappe.throw(f"Unknown SMS gateway adapter: {name}")
+
+	return frappe.get_attr(adapters[name])(get_gateway_config())
@@ -0,0 +1,35 @@
+"""Delivery lanes.
+
+Transactional messages (POS receipts, OTPs) and bulk traffic (campaigns, trigger
+rules) are claimed, throttled and budgeted separately, so a running campaign
+cannot hold back a receipt or an OTP.
+"""
+
+import frappe
+from frappe.utils import flt
+
+BULK = "Bulk"
+TRANSACTIONAL = "Transactional"
+
+DEFAULT_TRANSACTIONAL_RATE = 10
+
+
+def get_lane_rate(lane=BULK):
+	"""Messages per second a worker may send in `lane`"""
+	from sms_trigger.sms_trigger.utils.dispatch import get_dispatch_settings
+	from sms_trigger.sms_trigger.utils.settings import get_settings
+
+	if lane == TRANSACTIONAL:
+		return flt(get_settings().transactional_rate_per_second) or DEFAULT_TRANSACTIONAL_RATE
+	return get_dispatch_settings()["rate"]
+
+
+def enqueue_transactional_drain():
+	"""Start sending the transactional lane right after the current transaction commits"""
+	frappe.enqueue(
+		"sms_trigger.sms_trigger.utils.trigger_engine.drain_pending_sms",
+		lane=TRANSACTIONAL,
+		max_seconds=240,
+		queue="short",
+		enqueue_after_commit=True
+	)
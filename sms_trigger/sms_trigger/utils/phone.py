@@ -0,0 +1,131 @@
+"""Mobile number normalization.
+
+Numbers are canonicalized to E.164 (`+8801712345678`). Numbers written
+without a country code get the default country code from SMS Trigger
+Settings, a leading trunk `0` is dropped and `00` is read as `+`. Without a
+default country code such numbers cannot be made international, so they are
+kept as 10 to 15 digits the way they were written (`01712345678`).
+Customers keep the result in the indexed `normalized_mobile_no` column so
+triggers and campaigns never clean the same number again.
+"""
+
+import re
+
+import frappe
+from frappe.utils import cstr
+
+E164_PATTERN = re.compile(r"^\+[1-9]\d{7,14}$")
+NON_DIGITS = re.compile(r"\D")
+
+MIN_DIGITS = 8
+MAX_DIGITS = 15
+# Numbers kept as written when no default country code is set
+MIN_LOCAL_DIGITS = 10
+
+INVALID_NUMBER_ERROR = "Invalid mobile number"
+
+
+def get_default_country_code():
+	from sms_trigger.sms_trigger.utils.settings import get_settings
+
+	return get_settings().default_country_code
+
+
+def normalize(mobile_no, country_code=None):
+	"""Return `mobile_no` in E.164 format, or None if it is not a valid number.
+
+	Without a country code, numbers that are not international come back as digits only.
+	"""
+	if country_code is None:
+		country_code = get_default_country_code()
+	return _normalize(mobile_no, country_code)
+
+
+def normalize_many(mobile_nos, country_code=None):
+	"""Normalize a whole list in one pass, each distinct number is only cleaned once"""
+	if country_code is None:
+		country_code = get_default_country_code()
+
+	seen = {}
+	normalized = []
+	for mobile_no in mobile_nos:
+		if mobile_no not in seen:
+			seen[mobile_no] = _normalize(mobile_no, country_code)
+		normalized.append(seen[mobile_no])
+	return normalized
+
+
+def _normalize(mobile_no, country_code):
+	mobile_no = cstr(mobile_no).strip()
+	if not mobile_no:
+		return None
+
+	if E164_PATTERN.match(mobile_no):
+		return mobile_no
+
+	international = mobile_no.startswith("+")
+	digits = NON_DIGITS.sub("", mobile_no)
+	if not international and digits.startswith("00"):
+		international = True
+		digits = digits[2:]
+
+	if not international and not country_code:
+		return digits if MIN_LOCAL_DIGITS <= len(digits) <= MAX_DIGITS else None
+
+	if not international:
+		if digits.startswith("0"):
+			digits = country_code + digits[1:]
+		elif not digits.startswith(country_code):
+			digits = country_code + digits
+
+	if not MIN_DIGITS <= len(digits) <= MAX_DIGITS or digits.startswith("0"):
+		return None
+	return "+" + digits
+
+
+def to_gateway_number(mobile_no):
+	"""Normalized number as sent to the gateway, digits only"""
+	return mobile_no[1:] if mobile_no and mobile_no.startswith("+") else mobile_no
+
+
+def set_customer_mobile(doc, method=None):
+	"""Keep the normalized mobile number of a customer in sync (Customer validate)"""
+	if doc.meta.has_field("normalized_mobile_no"):
+		doc.normalized_mobile_no = normalize(doc.mobile_no)
+
+
+def backfill_customer_mobiles(chunk_size=2000):
+	"""Normalize the mobile number of every customer, one chunk and commit at a time"""
+	country_code = get_default_country_code()
+	last_name = ""
+	updated = 0
+	while True:
+		customers = frappe.get_all("Customer",
+			filters={"name": [">", last_name]},
+			fields=["name", "mobile_no", "normalized_mobile_no"],
+			order_by="name asc",
+			limit=chunk_size
+		)
+		if not customers:
+			break
+
+		normalized = normalize_many([c.mobile_no for c in customers], country_code)
+		changed = [
+			(c.name, value) for c, value in zip(customers, normalized, strict=True)
+			if (c.normalized_mobile_no or None) != value
+		]
+		if changed:
+			frappe.db.sql("""
+				UPDATE `tabCustomer`
+				SET normalized_mobile_no = CASE name {cases} END
+				WHERE name IN ({names})
+			""".format(
+				cases=" ".join(["WHEN %s THEN %s"] * len(changed)),
+				names=", ".join(["%s"] * len(changed))
+			), [v for row in changed for v in row] + [name for name, _ in changed])
+			frappe.db.commit()
+			updated += len(changed)
+
+		last_name = customers[-1].name
+
+	return updated
@@ -1,13 +1,33 @@
 import frappe
 from frappe.utils import random_string, cint
+from sms_trigger.sms_trigger.utils.lanes import TRANSACTIONAL
+from sms_trigger.sms_trigger.utils.settings import get_settings
 from sms_trigger.sms_trigger.utils.sms_gateway import send_sms
+from sms_trigger.sms_trigger.utils.template_cache import render as render_template
 
 OTP_CACHE_PREFIX = "pos_otp"
+CUSTOMER_CACHE_PREFIX = "pos_otp_customer"
+CUSTOMER_CACHE_TTL = 300
+
+def get_customer_attributes(customer):
+	"""Customer fields used on the POS path, fetched in one query and cached for a few minutes"""
+	cache_key = f"{CUSTOMER_CACHE_PREFIX}:{customer}"
+	attributes = frappe.cache().get_value(cache_key)
+	if attributes is None:
+		attributes = frappe.db.get_value(
+			"Customer", customer, ["customer_group", "customer_type", "mobile_no"], as_dict=True
+		) or {}
+		frappe.cache().set_value(cache_key, attributes, expires_in_sec=CUSTOMER_CACHE_TTL)
+	return frappe._dict(attributes)
+
+def clear_customer_attributes(doc, method=None):
+	"""Drop the cached POS attributes of a customer (Customer on_update / on_trash)"""
+	frappe.cache().delete_value(f"{CUSTOMER_CACHE_PREFIX}:{doc.name}")
 
 @frappe.whitelist()
 def send_otp(customer):
 	"""Generate and send OTP to customer"""
-	settings = frappe.get_single("SMS Trigger Settings")
+	settings = get_settings()
 	if not settings.enable_pos_otp:
 		return {"success": False, "error": "OTP verification is disabled"}
 
@@ -15,7 +35,7 @@ def send_otp(customer):
 		return {"success": False, "error": "Customer is required"}
 
 	# Get mobile number
-	mobile_no = frappe.get_value("Customer", customer, "mobile_no")
+	mobile_no = get_customer_attributes(customer).mobile_no
 	if not mobile_no:
 		return {"success": False, "error": "Customer has no mobile number"}
 
@@ -34,10 +54,10 @@ def send_otp(customer):
 
 	# Prepare message
 	context = {"otp": otp, "minutes": expiry_mins}
-	message = frappe.render_template(settings.otp_message_template, context)
+	message = render_template(settings.otp_message_template, context)
 
 	# Send SMS
-	result = send_sms(mobile_no, message)
+	result = send_sms(mobile_no, message, lane=TRANSACTIONAL)
 	
 	if result.get("success"):
 		return {"success": True, "message": f"OTP sent to {mobile_no}", "expiry": expiry_mins}
@@ -72,22 +92,20 @@ def validate_otp(customer, otp):
 @frappe.whitelist()
 def check_otp_requirement(customer, grand_total=0, total=0, discount_amount=0):
 	"""Check if OTP is required for this customer"""
-	settings = frappe.get_single("SMS Trigger Settings")
+	settings = get_settings()
 	if not settings.enable_pos_otp:
 		return {"required": False}
 
 	# Check customer type/group filter
 	required = False
 	
-	customer_group = frappe.get_value("Customer", customer, "customer_group")
-	customer_type = frappe.get_value("Customer", customer, "customer_type")
+	attributes = get_customer_attributes(customer)
 	
 	if settings.pos_customer_types:
-		allow_types = [t.strip() for t in settings.pos_customer_types.split(',')]
-		if customer_type in allow_types:
+		if attributes.customer_type in settings.pos_customer_types:
 			required = True
 	else:
-		if customer == "Walking Customer" or customer_group == "Walking Customer":
+		if customer == "Walking Customer" or attributes.customer_group == "Walking Customer":
 			required = True
 	
 	if not required:
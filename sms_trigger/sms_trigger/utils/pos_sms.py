@@ -1,11 +1,34 @@
 import frappe
 from frappe.utils import now_datetime, flt
+from sms_trigger.sms_trigger.utils.lanes import TRANSACTIONAL, enqueue_transactional_drain
+from sms_trigger.sms_trigger.utils.settings import get_settings
+from sms_trigger.sms_trigger.utils.template_cache import render as render_template
 
 def send_pos_invoice_sms(doc, method):
-	"""Send SMS to customer when POS Invoice is submitted"""
+	"""Queue the receipt SMS when a POS Invoice is submitted (on_submit).
+
+	Only an event is queued here, after the cashier's transaction commits;
+	rendering and creating the SMS happen in `create_pos_invoice_sms`.
+	"""
+	frappe.enqueue(
+		"sms_trigger.sms_trigger.utils.pos_sms.create_pos_invoice_sms",
+		invoice=doc.name,
+		queue="short",
+		job_id=f"pos_invoice_sms::{doc.name}",
+		enqueue_after_commit=True
+	)
+
+def create_pos_invoice_sms(invoice):
+	"""Background job that renders and creates the receipt SMS of a POS Invoice"""
 	try:
+		# A retried job must not create a second receipt
+		if frappe.db.exists("Scheduled SMS", {"reference_doctype": "POS Invoice", "reference_name": invoice}):
+			return
+
+		doc = frappe.get_doc("POS Invoice", invoice)
+
 		# Get SMS settings
-		sms_settings = frappe.get_single("SMS Trigger Settings")
+		sms_settings = get_settings()
 		
 		# Check if POS SMS is enabled
 		if not sms_settings.enable_pos_sms:
@@ -25,8 +48,7 @@ def send_pos_invoice_sms(doc, method):
 		
 		# Check customer type filter
 		if sms_settings.pos_customer_types:
-			allowed_types = [t.strip() for t in sms_settings.pos_customer_types.split(',') if t.strip()]
-			if customer.customer_type not in allowed_types:
+			if customer.customer_type not in sms_settings.pos_customer_types:
 				return
 		
 		# Prepare context for template
@@ -41,7 +63,7 @@ def send_pos_invoice_sms(doc, method):
 		}
 		
 		# Render message
-		message = frappe.render_template(sms_settings.pos_sms_template, context)
+		message = render_template(sms_settings.pos_sms_template, context)
 		
 		# Create scheduled SMS
 		sms_doc = frappe.get_doc({
@@ -51,6 +73,7 @@ def send_pos_invoice_sms(doc, method):
 			"message": message,
 			"trigger_type": "POS Invoice",
 			"scheduled_datetime": now_datetime(),
+			"lane": TRANSACTIONAL,
 			"reference_doctype": "POS Invoice",
 			"reference_name": doc.name
 		})
@@ -58,9 +81,10 @@ def send_pos_invoice_sms(doc, method):
 		
 		# Submit to send immediately
 		sms_doc.submit()
+		enqueue_transactional_drain()
 		
 	except Exception as e:
-		frappe.log_error(f"Error sending POS Invoice SMS for {doc.name}: {str(e)}", "POS SMS Error")
+		frappe.log_error(f"Error sending POS Invoice SMS for {invoice}: {e}", "POS SMS Error")
 
 def get_item_list(doc):
 	"""Get formatted item list"""
@@ -0,0 +1,53 @@
+"""Last purchase date per customer.
+
+`Customer.last_purchase_date` is the latest posting date of a submitted
+Sales Invoice or POS Invoice. It is moved forward on submit and recomputed
+for the customer on cancel, so inactivity checks are range scans on an
+indexed column instead of a NOT EXISTS over every invoice.
+"""
+
+import frappe
+
+INVOICE_DOCTYPES = ("Sales Invoice", "POS Invoice")
+
+
+def update_last_purchase_date(doc, method=None):
+	"""Sales Invoice / POS Invoice on_submit and on_cancel"""
+	if not doc.customer:
+		return
+
+	if doc.docstatus == 1:
+		frappe.db.sql("""
+			UPDATE `tabCustomer`
+			SET last_purchase_date = %(posting_date)s
+			WHERE name = %(customer)s
+			AND (last_purchase_date IS NULL OR last_purchase_date < %(posting_date)s)
+		""", {"customer": doc.customer, "posting_date": doc.posting_date})
+	else:
+		frappe.db.set_value("Customer", doc.customer, "last_purchase_date",
+			get_last_purchase_date(doc.customer), update_modified=False)
+
+
+def get_last_purchase_date(customer):
+	dates = [
+		frappe.db.get_value(doctype, {"customer": customer, "docstatus": 1}, "max(posting_date)")
+		for doctype in INVOICE_DOCTYPES
+	]
+	dates = [d for d in dates if d]
+	return max(dates) if dates else None
+
+
+def backfill_last_purchase_date():
+	frappe.db.sql("""
+		UPDATE `tabCustomer` c
+		JOIN (
+			SELECT customer, MAX(posting_date) AS last_purchase_date
+			FROM (
+				SELECT customer, posting_date FROM `tabSales Invoice` WHERE docstatus = 1
+				UNION ALL
+				SELECT customer, posting_date FROM `tabPOS Invoice` WHERE docstatus = 1
+			) invoices
+			GROUP BY customer
+		) purchases ON purchases.customer = c.name
+		SET c.last_purchase_date = purchases.last_purchase_date
+	""")
@@ -0,0 +1,190 @@
+import time
+from urllib.parse import urlparse
+
+import frappe
+from frappe.utils import cint, cstr
+
+from sms_trigger.sms_trigger.utils.lanes import BULK, TRANSACTIONAL
+
+RATE_LIMIT_PREFIX = "sms_rate"
+
+DEFAULT_PER_NUMBER_LIMIT = 5
+DEFAULT_PER_NUMBER_WINDOW = 3600
+GATEWAY_WINDOW = 60
+GLOBAL_WINDOW = 60
+
+
+class SlidingWindowLimiter:
+	"""Sliding window counter shared by all workers through the site cache.
+
+	Each key keeps one Redis counter per fixed window. The sliding count is the
+	current window plus the previous one weighted by how much of it still overlaps,
+	so a check is a constant number of Redis commands regardless of traffic. Counters
+	expire after two windows, so numbers that stop sending are evicted automatically.
+	"""
+
+	def __init__(self, scope, limit, window):
+		self.scope = scope
+		self.limit = cint(limit)
+		self.window = cint(window) or 1
+
+	def _keys(self, key, now=None):
+		now = now or time.time()
+		current = int(now // self.window)
+		prefix = f"{RATE_LIMIT_PREFIX}:{self.scope}:{key}"
+		cache = frappe.cache()
+		return (
+			cache.make_key(f"{prefix}:{current}"),
+			cache.make_key(f"{prefix}:{current - 1}"),
+			(now % self.window) / self.window,
+		)
+
+	def _weighted(self, current, previous, elapsed):
+		return cint(current) + cint(previous) * (1 - elapsed)
+
+	def count(self, key):
+		"""Return the number of hits for `key` within the sliding window"""
+		current_key, previous_key, elapsed = self._keys(key)
+		current, previous = frappe.cache().mget([current_key, previous_key])
+		return self._weighted(current, previous, elapsed)
+
+	def is_limited(self, key, amount=1):
+		if self.limit <= 0:
+			return False
+		return self.count(key) + amount > self.limit
+
+	def hit(self, key, amount=1):
+		"""Record `amount` hits for `key`"""
+		current_key, _, _ = self._keys(key)
+		pipe = frappe.cache().pipeline()
+		pipe.incrby(current_key, amount)
+		pipe.expire(current_key, self.window * 2)
+		pipe.execute()
+
+	def try_acquire(self, key, amount=1):
+		"""Atomically record `amount` hits if that stays within the limit"""
+		if self.limit <= 0:
+			return True
+
+		current_key, previous_key, elapsed = self._keys(key)
+		pipe = frappe.cache().pipeline()
+		pipe.incrby(current_key, amount)
+		pipe.expire(current_key, self.window * 2)
+		pipe.get(previous_key)
+		current, _, previous = pipe.execute()
+
+		if self._weighted(current, previous, elapsed) > self.limit:
+			# Give the hits back so a rejected attempt does not count
+			frappe.cache().decrby(current_key, amount)
+			return False
+		return True
+
+	def acquire(self, key, amount=1, timeout=30):
+		"""Wait up to `timeout` seconds for room in the window, returns False on timeout"""
+		deadline = time.monotonic() + timeout
+		while not self.try_acquire(key, amount):
+			if time.monotonic() >= deadline:
+				return False
+			time.sleep(min(1, self.window / max(self.limit, 1)))
+		return True
+
+	async def acquire_async(self, key, amount=1, timeout=30):
+		"""`acquire` for the asyncio pipeline, waits without blocking the event loop"""
+		import asyncio
+
+		deadline = time.monotonic() + timeout
+		while not self.try_acquire(key, amount):
+			if time.monotonic() >= deadline:
+				return False
+			await asyncio.sleep(min(1, self.window / max(self.limit, 1)))
+		return True
+
+
+def get_limits(lane=BULK):
+	"""Per-number, per-gateway and global limits from SMS Trigger Settings.
+
+	Bulk traffic sees the global and per-gateway limits reduced by the capacity
+	reserved for the transactional lane. Both lanes count against the same
+	windows, so bulk can fill the limits only up to that reserve.
+	"""
+	from sms_trigger.sms_trigger.utils.settings import get_settings
+
+	values = get_settings()
+
+	reserve = cint(values.get("transactional_reserve_per_minute")) if lane != TRANSACTIONAL else 0
+
+	def lane_limit(limit):
+		limit = cint(limit)
+		return max(limit - reserve, 1) if limit > 0 and reserve else limit
+
+	return {
+		"number": SlidingWindowLimiter(
+			"number", cint(values.get("rate_limit_per_number")) or DEFAULT_PER_NUMBER_LIMIT, DEFAULT_PER_NUMBER_WINDOW
+		),
+		"gateway": SlidingWindowLimiter("gateway", lane_limit(values.get("rate_limit_per_gateway")), GATEWAY_WINDOW),
+		"global": SlidingWindowLimiter("global", lane_limit(values.get("rate_limit_global")), GLOBAL_WINDOW),
+	}
+
+
+def get_gateway_key(gateway_url=None):
+	"""Identify a gateway by the host of its URL"""
+	if not gateway_url:
+		from sms_trigger.sms_trigger.utils.settings import get_settings
+
+		gateway_url = get_settings().gateway.url
+	return urlparse(cstr(gateway_url)).netloc or cstr(gateway_url) or "default"
+
+
+def acquire_number(mobile_no):
+	"""Reserve one message to `mobile_no` under the per-number limit, False when it is used up"""
+	return get_limits()["number"].try_acquire(mobile_no)
+
+
+def release_number(mobile_no):
+	"""Give back a reservation whose message was not sent"""
+	get_limits()["number"].hit(mobile_no, -1)
+
+
+def acquire_gateway_capacity(amount=1, gateway_url=None, timeout=30, lane=BULK):
+	"""Reserve room for `amount` messages of `lane` under the global and per-gateway limits.
+
+	Returns an error message when no room frees up within `timeout` seconds.
+	"""
+	limits = get_limits(lane)
+	if not limits["global"].acquire("all", amount, timeout=timeout):
+		return "Global SMS rate limit exceeded"
+
+	if not limits["gateway"].acquire(get_gateway_key(gateway_url), amount, timeout=timeout):
+		limits["global"].hit("all", -amount)
+		return "Gateway rate limit exceeded"
+
+	return None
+
+
+async def acquire_gateway_capacity_async(amount=1, gateway_url=None, timeout=30, lane=BULK):
+	"""`acquire_gateway_capacity` for the asyncio pipeline"""
+	limits = get_limits(lane)
+	if not await limits["global"].acquire_async("all", amount, timeout=timeout):
+		return "Global SMS rate limit exceeded"
+
+	if not await limits["gateway"].acquire_async(get_gateway_key(gateway_url), amount, timeout=timeout):
+		limits["global"].hit("all", -amount)
+		return "Gateway rate limit exceeded"
+
+	return None
+
+
+@frappe.whitelist()
+def get_rate_limit_status(mobile_no=None):
+	"""Current usage of each limit"""
+	limits = get_limits()
+	status = {
+		"global": {"count": limits["global"].count("all"), "limit": limits["global"].limit},
+		"gateway": {
+			"count": limits["gateway"].count(get_gateway_key()),
+			"limit": limits["gateway"].limit,
+		},
+	}
+	if mobile_no:
+		status["number"] = {"count": limits["number"].count(mobile_no), "limit": limits["number"].limit}
+	return status
@@ -0,0 +1,54 @@
+import random
+
+import frappe
+from frappe.utils import add_to_date, cint, now_datetime
+
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_BASE_DELAY = 60
+MAX_DELAY = 3600
+
+
+def get_retry_settings():
+	from sms_trigger.sms_trigger.utils.settings import get_settings
+
+	settings = get_settings()
+	return frappe._dict(
+		max_attempts=cint(settings.sms_max_attempts) or DEFAULT_MAX_ATTEMPTS,
+		base_delay=cint(settings.sms_retry_base_delay) or DEFAULT_BASE_DELAY,
+	)
+
+
+def get_backoff(attempts, base_delay=DEFAULT_BASE_DELAY):
+	"""Seconds to wait after `attempts` failed attempts.
+
+	Exponential backoff with jitter, so messages that failed together during a
+	gateway outage do not all come back at the same moment.
+	"""
+	delay = min(MAX_DELAY, base_delay * 2 ** max(cint(attempts) - 1, 0))
+	return random.uniform(delay / 2, delay)
+
+
+def get_next_attempt_at(attempts, settings=None):
+	"""When to retry after `attempts` attempts, or None once retries are exhausted"""
+	settings = settings or get_retry_settings()
+	if cint(attempts) >= settings.max_attempts:
+		return None
+	return add_to_date(now_datetime(), seconds=get_backoff(attempts, settings.base_delay))
+
+
+def get_result_values(result, attempts, settings=None):
+	"""Scheduled SMS field values recording a send `result` after `attempts` attempts.
+
+	Retryable failures go back to Draft with a `next_attempt_at`, everything else
+	is final.
+	"""
+	if result.get("success"):
+		return {"status": "Sent", "sent_datetime": now_datetime(), "attempts": attempts, "next_attempt_at": None}
+
+	values = {"attempts": attempts, "error_message": result.get("error", "Unknown error")}
+	next_attempt_at = get_next_attempt_at(attempts, settings) if result.get("retryable") else None
+	if next_attempt_at:
+		values.update(status="Draft", next_attempt_at=next_attempt_at)
+	else:
+		values.update(status="Failed", next_attempt_at=None)
+	return values
@@ -0,0 +1,93 @@
+import pickle
+import threading
+
+import frappe
+from frappe.model import no_value_fields
+from frappe.utils import cstr
+
+SNAPSHOT_KEY = "sms_trigger_settings_snapshot"
+VERSION_KEY = "sms_trigger_settings_version"
+
+# site -> (version, snapshot), so a worker only unpickles the snapshot again after a save
+_snapshots = {}
+_lock = threading.Lock()
+
+
+class SettingsSnapshot(dict):
+	"""Read-only, pre-parsed view of SMS Trigger Settings and the SMS Settings gateway.
+
+	Values read like document fields (`settings.enable_pos_otp`). Comma separated
+	fields are already split into tuples.
+	"""
+
+	def __getattr__(self, key):
+		return self.get(key)
+
+	def _read_only(self, *args, **kwargs):
+		raise TypeError("Settings snapshot is read-only")
+
+	__setattr__ = __setitem__ = __delitem__ = _read_only
+	clear = pop = popitem = setdefault = update = _read_only
+
+
+def build_snapshot():
+	"""Read both settings documents from the database"""
+	from sms_trigger.sms_trigger.utils.gateway_adapters import build_gateway_config
+
+	doc = frappe.get_single("SMS Trigger Settings")
+	values = {
+		df.fieldname: doc.get(df.fieldname) for df in doc.meta.fields if df.fieldtype not in no_value_fields
+	}
+	values["pos_customer_types"] = tuple(
+		t.strip() for t in cstr(values.get("pos_customer_types")).split(",") if t.strip()
+	)
+	values["default_country_code"] = "".join(c for c in cstr(values.get("default_country_code")) if c.isdigit())
+	values["gateway"] = frappe._dict(build_gateway_config())
+	return values
+
+
+def get_settings():
+	"""Settings snapshot, cached in this process and in the site cache until either settings document is saved"""
+	version = _get(VERSION_KEY)
+
+	site = frappe.local.site
+	cached = _snapshots.get(site)
+	if version and cached and cached[0] == version:
+		return cached[1]
+
+	values = _get(SNAPSHOT_KEY) if version else None
+	if values is None:
+		values = build_snapshot()
+		version = frappe.generate_hash(length=10)
+		_set(SNAPSHOT_KEY, values)
+		_set(VERSION_KEY, version)
+
+	snapshot = SettingsSnapshot(values)
+	with _lock:
+		_snapshots[site] = (version, snapshot)
+	return snapshot
+
+
+def _get(key):
+	"""Read straight from Redis, `get_value` would keep serving the first read of the job from `frappe.local.cache`"""
+	cache = frappe.cache()
+	value = cache.get(cache.make_key(key))
+	return pickle.loads(value) if value is not None else None
+
+
+def _set(key, value):
+	cache = frappe.cache()
+	cache.set(cache.make_key(key), pickle.dumps(value))
+
+
+def clear_settings_cache(doc=None, method=None):
+	"""Invalidate the snapshot in every worker (SMS Settings / SMS Trigger Settings on_update)"""
+	_clear()
+	# Again once the save is visible, a worker may have cached the old values in between
+	frappe.db.after_commit.add(_clear)
+
+
+def _clear():
+	frappe.cache().delete_value([SNAPSHOT_KEY, VERSION_KEY])
+	with _lock:
+		_snapshots.pop(frappe.local.site, None)
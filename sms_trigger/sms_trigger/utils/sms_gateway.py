@@ -1,24 +1,35 @@
 import frappe
 import requests
-from frappe.utils import cstr, now_datetime, get_datetime
-import time
-import re
-from frappe.core.doctype.sms_settings.sms_settings import validate_receiver_nos
+from frappe.utils import cint, cstr
 
-# Rate limiting cache
-sms_rate_limit = {}
+from sms_trigger.sms_trigger.utils.circuit_breaker import get_gateway_breaker
+from sms_trigger.sms_trigger.utils.lanes import BULK
+from sms_trigger.sms_trigger.utils.phone import (
+	INVALID_NUMBER_ERROR,
+	normalize,
+	normalize_many,
+	to_gateway_number,
+)
+from sms_trigger.sms_trigger.utils.rate_limiter import (
+	acquire_gateway_capacity,
+	acquire_number,
+	release_number,
+)
+from sms_trigger.sms_trigger.utils.settings import get_settings
 
-def send_sms(mobile_no, message, max_retries=3, retry_delay=5):
-	"""Send SMS using ERPNext SMS Settings with retry mechanism and rate limiting"""
+CIRCUIT_OPEN_RESULT = {"success": False, "error": "SMS gateway unavailable (circuit open)", "retryable": True}
+
+def send_sms(mobile_no, message, lane=BULK):
+	"""Send SMS through the configured gateway adapter with rate limiting.
+
+	Makes a single attempt and never sleeps. Failures that may succeed later are
+	returned with `retryable` set, callers reschedule them instead of waiting.
+	"""
 	# Clean and validate mobile number
 	mobile_no = clean_mobile_number(mobile_no)
 	if not mobile_no:
 		return {"success": False, "error": "Invalid mobile number"}
 	
-	# Check rate limiting
-	if is_rate_limited(mobile_no):
-		return {"success": False, "error": "Rate limit exceeded for this number"}
-	
 	# Validate message
 	if not message or len(message.strip()) == 0:
 		return {"success": False, "error": "Message cannot be empty"}
@@ -26,66 +37,158 @@ def send_sms(mobile_no, message, max_retries=3, retry_delay=5):
 	if len(message) > 1600:  # SMS character limit
 		message = message[:1600]
 	
-	for attempt in range(max_retries):
-		try:
-			from frappe.core.doctype.sms_settings.sms_settings import send_sms as frappe_send_sms
-			
-			# Check if SMS settings are configured
-			sms_settings = frappe.get_single("SMS Settings")
-			if not sms_settings.sms_gateway_url:
-				return {"success": False, "error": "SMS Gateway not configured in SMS Settings"}
-			
-			frappe_send_sms([mobile_no], cstr(message), success_msg=False)
-			update_rate_limit(mobile_no)
-			frappe.log_info(f"SMS sent successfully to {mobile_no}", "SMS Gateway")
-			return {"success": True, "message": "SMS sent successfully"}
-			
-		except requests.exceptions.RequestException as e:
-			error_msg = f"Attempt {attempt + 1} failed: Network or API error: {str(e)}"
-			if attempt < max_retries - 1:
-				frappe.log_warning(error_msg, "SMS Gateway Retry")
-				time.sleep(retry_delay * (2 ** attempt)) # Exponential backoff
-			else:
-				frappe.log_error(f"SMS sending failed after {max_retries} attempts: {error_msg}", "SMS Gateway Error")
-				return {"success": False, "error": error_msg}
-		except Exception as e:
-			error_msg = str(e)
-			frappe.log_error(f"SMS sending failed: {error_msg}", "SMS Gateway Error")
-			return {"success": False, "error": error_msg}
-	frappe.log_error("SMS sending failed with unknown error", "SMS Gateway Error")
-	return {"success": False, "error": "Unknown error during SMS sending"}
+	# Check rate limiting
+	if not reserve_rate_limit(mobile_no):
+		return {"success": False, "error": "Rate limit exceeded for this number", "retryable": True}
+
+	result = send_chunk([mobile_no], message, lane=lane)
+	if not result.get("success"):
+		release_rate_limit(mobile_no)
+	return result
+
+def get_batch_size():
+	"""Number of receivers sent per gateway request (1 disables batching)"""
+	return cint(get_settings().gateway_batch_size) or 1
+
+def send_sms_batch(mobile_nos, message, batch_size=None, lane=BULK):
+	"""Send the same message to many numbers, packing receivers into one gateway request per chunk.
+
+	Returns a list of result dicts in the same order as `mobile_nos`.
+	"""
+	batch_size = max(cint(batch_size) or get_batch_size(), 1)
+	message, results, sendable = prepare_receivers(mobile_nos, message)
+
+	for start in range(0, len(sendable), batch_size):
+		chunk = sendable[start:start + batch_size]
+		result = send_chunk([cleaned for idx, cleaned in chunk], message, lane=lane)
+		for idx, cleaned in chunk:
+			if not result.get("success"):
+				release_rate_limit(cleaned)
+			results[idx] = dict(result)
+
+	return results
+
+def prepare_receivers(mobile_nos, message):
+	"""Validate a message and its receivers before sending.
+
+	Returns `(message, results, sendable)`: the message trimmed to the SMS limit,
+	a result list in the order of `mobile_nos` with failures already filled in,
+	and `(index, cleaned number)` pairs for the receivers that may be sent to.
+	Each of those already holds a per-number reservation, release it with
+	`release_rate_limit` when the send fails.
+	"""
+	results = [None] * len(mobile_nos)
+
+	if not message or len(message.strip()) == 0:
+		return message, [{"success": False, "error": "Message cannot be empty"} for _ in mobile_nos], []
+
+	if len(message) > 1600:  # SMS character limit
+		message = message[:1600]
+
+	sendable = []
+	for idx, normalized in enumerate(normalize_many(mobile_nos)):
+		cleaned = to_gateway_number(normalized)
+		if not cleaned:
+			results[idx] = {"success": False, "error": INVALID_NUMBER_ERROR}
+		elif not reserve_rate_limit(cleaned):
+			results[idx] = {"success": False, "error": "Rate limit exceeded for this number", "retryable": True}
+		else:
+			sendable.append((idx, cleaned))
+
+	return message, results, sendable
+
+def send_chunk(receivers, message, lane=BULK):
+	"""Send one gateway request with comma separated receivers, a single attempt like `send_sms`"""
+	from sms_trigger.sms_trigger.utils.gateway_adapters import get_adapter
+
+	try:
+		adapter = get_adapter()
+		if not adapter.url:
+			return {"success": False, "error": "SMS Gateway not configured in SMS Settings"}
+
+		# Fail fast while the gateway is known to be down
+		breaker = get_gateway_breaker(adapter.url)
+		if not breaker.allow_request():
+			return CIRCUIT_OPEN_RESULT.copy()
+
+		# Global and per-gateway limits, shared by all workers
+		limit_error = acquire_gateway_capacity(len(receivers), adapter.url, lane=lane)
+		if limit_error:
+			return {"success": False, "error": limit_error, "retryable": True}
+
+		status = adapter.send(receivers, message)
+		result = get_status_result(status, breaker, receivers)
+		if result.get("success"):
+			log_sent_sms(message, receivers)
+		return result
+
+	except requests.exceptions.RequestException as e:
+		# Client errors say nothing about the health of the gateway
+		if getattr(e.response, "status_code", 500) >= 500:
+			breaker.record_failure()
+		error_msg = f"Network or API error: {e}"
+		frappe.log_error(f"SMS sending failed: {error_msg}", "SMS Gateway Error")
+		return {"success": False, "error": error_msg, "retryable": True}
+	except Exception as e:
+		error_msg = str(e)
+		frappe.log_error(f"SMS sending failed: {error_msg}", "SMS Gateway Error")
+		return {"success": False, "error": error_msg}
+
+def log_sent_sms(message, receivers):
+	"""Create the SMS Log of a delivered gateway request.
+
+	The message has already left, so a failure here is logged and never turned
+	into a failed send.
+	"""
+	from frappe.core.doctype.sms_settings.sms_settings import create_sms_log
+
+	try:
+		create_sms_log({"message": cstr(message).encode("utf-8"), "receiver_list": receivers}, receivers)
+	except Exception:
+		frappe.log_error(f"Could not create SMS Log for {len(receivers)} numbers", "SMS Gateway Error")
+
+def get_status_result(status, breaker, receivers):
+	"""Turn the HTTP status of a gateway request into a send result, feeding the circuit breaker"""
+	if cint(status) >= 500:
+		breaker.record_failure()
+	else:
+		breaker.record_success()
+
+	if not 200 <= cint(status) < 300:
+		error_msg = f"Gateway returned HTTP {status}"
+		frappe.log_error(f"SMS to {len(receivers)} numbers failed: {error_msg}", "SMS Gateway Error")
+		# Throttling and server errors are worth another attempt
+		return {"success": False, "error": error_msg, "retryable": cint(status) == 429 or cint(status) >= 500}
+
+	return {"success": True, "message": "SMS sent successfully"}
+
+def group_by_message(items, get_message, batch_size=None):
+	"""Group items whose rendered message is identical into chunks of `batch_size`.
+
+	Returns a list of `(message, [items])` tuples.
+	"""
+	batch_size = cint(batch_size) or get_batch_size()
+	groups = {}
+	for item in items:
+		groups.setdefault(get_message(item), []).append(item)
+
+	chunks = []
+	for message, grouped in groups.items():
+		for start in range(0, len(grouped), batch_size):
+			chunks.append((message, grouped[start:start + batch_size]))
+	return chunks
 
 def clean_mobile_number(mobile_no):
-	"""Clean and validate mobile number"""
-	if not mobile_no:
-		return None
-	
-	# Remove all non-digit characters
-	mobile_no = re.sub(r'\D', '', cstr(mobile_no).strip())
-	
-	# Basic validation - should be between 10-15 digits
-	if len(mobile_no) < 10 or len(mobile_no) > 15:
-		return None
-	
-	return mobile_no
+	"""Normalize a mobile number to E.164 and return it as sent to the gateway (digits only)"""
+	return to_gateway_number(normalize(mobile_no))
 
-def is_rate_limited(mobile_no):
-	"""Check if mobile number is rate limited (max 5 SMS per hour)"""
-	current_time = now_datetime()
-	if mobile_no not in sms_rate_limit:
-		return False
-	
-	# Clean old entries
-	sms_rate_limit[mobile_no] = [t for t in sms_rate_limit[mobile_no] 
-								if (current_time - t).total_seconds() < 3600]
-	
-	return len(sms_rate_limit[mobile_no]) >= 5
+def reserve_rate_limit(mobile_no):
+	"""Atomically take one message of the number's limit (shared across all workers), False if it is used up"""
+	return acquire_number(mobile_no)
 
-def update_rate_limit(mobile_no):
-	"""Update rate limit tracking"""
-	if mobile_no not in sms_rate_limit:
-		sms_rate_limit[mobile_no] = []
-	sms_rate_limit[mobile_no].append(now_datetime())
+def release_rate_limit(mobile_no):
+	"""Give back the reservation of a message that was not sent"""
+	release_number(mobile_no)
 
 @frappe.whitelist()
 def test_sms_gateway(mobile_no, message="Test SMS from SMS Trigger"):
@@ -0,0 +1,97 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import frappe
+from frappe.utils import cstr
+
+MAX_TEMPLATES = 256
+
+_templates = OrderedDict()
+_lock = threading.Lock()
+
+
+def get_template_key(template):
+	return hashlib.sha1(cstr(template).encode("utf-8")).hexdigest()
+
+
+def get_compiled_template(template):
+	"""Return `template` bound to the current Jinja environment, compiling it at most once per process.
+
+	Only the compiled code is cached. Frappe builds a new environment per request
+	with that request's globals (session user, form dict), so the code is bound to
+	the current one on every call, which is cheap next to compiling.
+	"""
+	from frappe.utils.jinja import get_jenv
+
+	env = get_jenv()
+	key = get_template_key(template)
+	with _lock:
+		code = _templates.get(key)
+		if code is not None:
+			_templates.move_to_end(key)
+
+	if code is None:
+		if ".__" in cstr(template):
+			frappe.throw("Illegal template")
+
+		code = env.compile(cstr(template))
+
+		with _lock:
+			_templates[key] = code
+			_templates.move_to_end(key)
+			while len(_templates) > MAX_TEMPLATES:
+				_templates.popitem(last=False)
+
+	return env.template_class.from_code(env, code, env.make_globals(None))
+
+
+def render(template, context=None):
+	"""Drop-in replacement for frappe.render_template for message templates"""
+	from jinja2 import TemplateError
+
+	try:
+		return get_compiled_template(template).render(context or {})
+	except TemplateError:
+		frappe.throw(title="Jinja Template Error", msg=f"<pre>{template}</pre><pre>{frappe.get_traceback()}</pre>")
+
+
+def render_many(template, contexts, on_error=None):
+	"""Render one template against many contexts, compiling it only once.
+
+	If `on_error(index, exception)` is given, a context that fails to render is
+	reported through it and gets `None` instead of aborting the whole batch.
+	"""
+	compiled = get_compiled_template(template)
+	messages = []
+	for idx, context in enumerate(contexts):
+		try:
+			messages.append(compiled.render(context))
+		except Exception as e:
+			if not on_error:
+				raise
+			on_error(idx, e)
+			messages.append(None)
+	return messages
+
+
+def invalidate(template):
+	"""Evict a template source from the cache"""
+	with _lock:
+		_templates.pop(get_template_key(template), None)
+
+
+def clear():
+	with _lock:
+		_templates.clear()
+
+
+def invalidate_changed_templates(doc, fields):
+	"""Evict the previous source of template `fields` that changed on `doc`"""
+	before = doc.get_doc_before_save()
+	if not before:
+		return
+
+	for field in fields:
+		if before.get(field) and before.get(field) != doc.get(field):
+			invalidate(before.get(field))
@@ -0,0 +1,18 @@
+# Copyright (c) 2025, primetechbd and Contributors
+# See license.txt
+
+from frappe.tests.utils import FrappeTestCase
+
+from sms_trigger.sms_trigger.utils.birthdays import get_month_day_ranges
+
+
+class TestBirthdays(FrappeTestCase):
+	def test_single_day(self):
+		self.assertEqual(get_month_day_ranges("2025-06-15", "2025-06-15"), [(615, 615)])
+
+	def test_window_over_new_year(self):
+		self.assertEqual(get_month_day_ranges("2025-12-30", "2026-01-02"), [(1230, 1231), (101, 102)])
+
+	def test_leap_day_in_non_leap_year(self):
+		self.assertEqual(get_month_day_ranges("2025-02-28", "2025-02-28"), [(228, 229)])
+		self.assertEqual(get_month_day_ranges("2024-02-28", "2024-02-28"), [(228, 228)])
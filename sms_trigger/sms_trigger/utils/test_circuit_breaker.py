@@ -0,0 +1,32 @@
+# Copyright (c) 2025, primetechbd and Contributors
+# See license.txt
+
+import time
+
+from frappe.tests.utils import FrappeTestCase
+
+from sms_trigger.sms_trigger.utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class TestCircuitBreaker(FrappeTestCase):
+	def setUp(self):
+		self.breaker = CircuitBreaker("test-gateway", failure_threshold=2, reset_timeout=1)
+		self.breaker.record_success()
+
+	def test_opens_after_threshold(self):
+		self.breaker.record_failure()
+		self.assertEqual(self.breaker.get_state(), CLOSED)
+		self.breaker.record_failure()
+		self.assertEqual(self.breaker.get_state(), OPEN)
+		self.assertFalse(self.breaker.allow_request())
+
+	def test_half_open_allows_single_probe(self):
+		self.breaker.record_failure()
+		self.breaker.record_failure()
+		time.sleep(1.1)
+		self.assertEqual(self.breaker.get_state(), HALF_OPEN)
+		self.assertTrue(self.breaker.allow_request())
+		self.assertFalse(self.breaker.allow_request())
+
+		self.breaker.record_success()
+		self.assertEqual(self.breaker.get_state(), CLOSED)
@@ -0,0 +1,30 @@
+# Copyright (c) 2025, primetechbd and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from sms_trigger.sms_trigger.utils.conditions import compile_conditions
+
+
+class TestConditions(FrappeTestCase):
+	def test_table_operators_are_mapped(self):
+		rule = frappe._dict(use_json=0, condition_table=[
+			frappe._dict(field="customer_type", operator="Equals", value="Individual"),
+			frappe._dict(field="customer_group", operator="In", value="Retail, Wholesale"),
+			frappe._dict(field="item_code", operator="Equals", value="ITEM-001"),
+		])
+		plan = compile_conditions(rule)
+		self.assertEqual(plan.get_filters(), [
+			["customer_type", "=", "Individual"],
+			["customer_group", "in", ("Retail", "Wholesale")],
+		])
+		self.assertEqual(plan.params.item_code, "ITEM-001")
+
+		conditions, values = plan.get_sql("c")
+		self.assertEqual(conditions, " AND c.`customer_type` = %(cond_0)s AND c.`customer_group` IN %(cond_1)s")
+		self.assertEqual(values["cond_1"], ("Retail", "Wholesale"))
+
+	def test_unknown_field_is_rejected(self):
+		rule = frappe._dict(use_json=1, conditions='{"name; drop table": "x"}')
+		self.assertRaises(frappe.ValidationError, compile_conditions, rule)
@@ -0,0 +1,58 @@
+# Copyright (c) 2025, primetechbd and Contributors
+# See license.txt
+
+import time
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from sms_trigger.sms_trigger.utils.dispatch import TokenBucket, dispatch
+
+
+class TestDispatch(FrappeTestCase):
+	def test_token_bucket_throttles(self):
+		bucket = TokenBucket(rate=20, capacity=1, key=frappe.generate_hash(length=10))
+		start = time.monotonic()
+		for _ in range(5):
+			bucket.acquire()
+		# First token is free, the remaining four take 1/20s each
+		self.assertGreaterEqual(time.monotonic() - start, 0.18)
+
+	def test_token_bucket_is_shared(self):
+		# Buckets of the same key, as built by separate worker processes, draw on one budget
+		key = frappe.generate_hash(length=10)
+		first, second = TokenBucket(rate=1, capacity=1, key=key), TokenBucket(rate=1, capacity=1, key=key)
+		self.assertEqual(first.reserve(), 0)
+		self.assertGreater(second.reserve(), 0.5)
+
+	def test_dispatch_returns_every_result(self):
+		jobs = list(range(10))
+		results = dict(dispatch(jobs, lambda job: {"success": job % 2 == 0}, concurrency=1, rate=1000))
+		self.assertEqual(sorted(results), jobs)
+		self.assertEqual(sum(1 for r in results.values() if r["success"]), 5)
+
+	def test_dispatch_captures_send_errors(self):
+		def send(job):
+			raise ValueError("gateway down")
+
+		[(_job, result)] = list(dispatch([1], send, concurrency=1, rate=1000))
+		self.assertFalse(result["success"])
+		self.assertIn("gateway down", result["error"])
+
+	def test_closing_dispatch_stops_workers(self):
+		sent = []
+
+		def send(job):
+			sent.append(job)
+			time.sleep(0.05)
+			return {"success": True}
+
+		results = dispatch(range(50), send, concurrency=2, rate=1000)
+		next(results)
+		results.close()
+
+		# Closing joined the workers, nothing is sent afterwards
+		count = len(sent)
+		time.sleep(0.2)
+		self.assertEqual(len(sent), count)
+		self.assertLess(count, 50)
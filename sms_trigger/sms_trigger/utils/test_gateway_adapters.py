@@ -0,0 +1,49 @@
+# Copyright (c) 2025, primetechbd and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from sms_trigger.sms_trigger.utils.gateway_adapters import MockAdapter, SMSSettingsAdapter, get_adapter
+
+GATEWAY_CONFIG = frappe._dict(
+	url="https://sms.example.com/send",
+	use_post=0,
+	use_json=0,
+	headers={"Accept": "text/plain"},
+	params={"api_key": "secret"},
+	message_parameter="text",
+	receiver_parameter="to",
+)
+
+
+class TestGatewayAdapters(FrappeTestCase):
+	def test_get_adapter(self):
+		adapter = get_adapter("Mock")
+		self.assertIsInstance(adapter, MockAdapter)
+		self.assertEqual(adapter.url, "mock://sms-gateway")
+		self.assertIsInstance(get_adapter("SMS Settings"), SMSSettingsAdapter)
+
+		with self.assertRaises(frappe.ValidationError):
+			get_adapter("No Such Gateway")
+
+	def test_mock_adapter_accepts_every_message(self):
+		self.assertEqual(MockAdapter({}).send(["8801712345601", "8801712345602"], "Hello"), 200)
+
+	def test_sms_settings_request(self):
+		receivers = ["8801712345601", "8801712345602"]
+		params = {"api_key": "secret", "text": "Hello", "to": "8801712345601,8801712345602"}
+
+		method, kwargs = SMSSettingsAdapter(GATEWAY_CONFIG).get_request(receivers, "Hello")
+		self.assertEqual(method, "GET")
+		self.assertEqual(kwargs, {"headers": GATEWAY_CONFIG.headers, "params": params})
+
+		method, kwargs = SMSSettingsAdapter(frappe._dict(GATEWAY_CONFIG, use_post=1)).get_request(receivers, "Hello")
+		self.assertEqual((method, kwargs["data"]), ("POST", params))
+
+		config = frappe._dict(GATEWAY_CONFIG, use_post=1, use_json=1)
+		method, kwargs = SMSSettingsAdapter(config).get_request(receivers, "Hello")
+		self.assertEqual((method, kwargs["json"]), ("POST", params))
+
+		# The configured parameters are not modified between requests
+		self.assertEqual(GATEWAY_CONFIG.params, {"api_key": "secret"})
@@ -0,0 +1,32 @@
+# Copyright (c) 2025, primetechbd and Contributors
+# See license.txt
+
+from frappe.tests.utils import FrappeTestCase
+
+from sms_trigger.sms_trigger.utils.phone import normalize, normalize_many
+
+
+class TestPhone(FrappeTestCase):
+	def test_normalize_to_e164(self):
+		for mobile_no in ["01712345678", "8801712345678", "+880 1712-345678", "008801712345678", "1712345678"]:
+			self.assertEqual(normalize(mobile_no, "880"), "+8801712345678")
+
+	def test_invalid_numbers(self):
+		for mobile_no in [None, "", "123", "+0123456789", "8801712345678123456"]:
+			self.assertIsNone(normalize(mobile_no, "880"))
+
+	def test_normalize_many_keeps_order(self):
+		self.assertEqual(
+			normalize_many(["01712345678", "abc", "01712345678"], "880"),
+			["+8801712345678", None, "+8801712345678"],
+		)
+
+	def test_without_country_code_keeps_local_numbers(self):
+		self.assertEqual(normalize("01712345678", ""), "01712345678")
+		self.assertEqual(normalize("98765 43210", ""), "9876543210")
+		self.assertEqual(normalize("+880 1712-345678", ""), "+8801712345678")
+		self.assertEqual(normalize("008801712345678", ""), "+8801712345678")
+
+	def test_without_country_code_invalid_numbers(self):
+		for mobile_no in ["123456789", "8801712345678123456", "+0123456789"]:
+			self.assertIsNone(normalize(mobile_no, ""))
@@ -0,0 +1,40 @@
+# Copyright (c) 2025, primetechbd and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import get_datetime, now_datetime
+
+from sms_trigger.sms_trigger.utils.retry import MAX_DELAY, get_backoff, get_next_attempt_at, get_result_values
+
+RETRY_SETTINGS = frappe._dict(max_attempts=3, base_delay=60)
+
+
+class TestRetry(FrappeTestCase):
+	def test_backoff_doubles_with_jitter(self):
+		for attempts, delay in ((1, 60), (2, 120), (3, 240)):
+			for _ in range(20):
+				backoff = get_backoff(attempts, 60)
+				self.assertGreaterEqual(backoff, delay / 2)
+				self.assertLessEqual(backoff, delay)
+
+		self.assertLessEqual(get_backoff(30, 60), MAX_DELAY)
+
+	def test_no_retry_once_attempts_are_exhausted(self):
+		self.assertIsNotNone(get_next_attempt_at(2, RETRY_SETTINGS))
+		self.assertIsNone(get_next_attempt_at(3, RETRY_SETTINGS))
+
+	def test_result_values(self):
+		values = get_result_values({"success": True}, 1, RETRY_SETTINGS)
+		self.assertEqual((values["status"], values["attempts"], values["next_attempt_at"]), ("Sent", 1, None))
+
+		# Retryable failures go back to Draft until the last attempt
+		values = get_result_values({"success": False, "error": "HTTP 503", "retryable": True}, 1, RETRY_SETTINGS)
+		self.assertEqual((values["status"], values["error_message"]), ("Draft", "HTTP 503"))
+		self.assertGreater(get_datetime(values["next_attempt_at"]), now_datetime())
+
+		values = get_result_values({"success": False, "error": "HTTP 503", "retryable": True}, 3, RETRY_SETTINGS)
+		self.assertEqual((values["status"], values["next_attempt_at"]), ("Failed", None))
+
+		values = get_result_values({"success": False, "error": "HTTP 400"}, 1, RETRY_SETTINGS)
+		self.assertEqual((values["status"], values["next_attempt_at"]), ("Failed", None))
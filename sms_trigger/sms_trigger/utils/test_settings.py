@@ -0,0 +1,33 @@
+# Copyright (c) 2025, primetechbd and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from sms_trigger.sms_trigger.utils.settings import SNAPSHOT_KEY, VERSION_KEY, get_settings
+
+
+class TestSettingsSnapshot(FrappeTestCase):
+	def test_snapshot_is_read_only(self):
+		settings = get_settings()
+		with self.assertRaises(TypeError):
+			settings.pos_min_amount = 1
+		self.assertIsInstance(settings.pos_customer_types, tuple)
+
+	def test_save_refreshes_snapshot(self):
+		doc = frappe.get_single("SMS Trigger Settings")
+		doc.pos_customer_types = "Individual, Company"
+		doc.save()
+
+		self.assertEqual(get_settings().pos_customer_types, ("Individual", "Company"))
+		self.assertIs(get_settings(), get_settings())
+
+	def test_long_job_sees_save_from_another_worker(self):
+		get_settings()
+		frappe.db.set_single_value("SMS Trigger Settings", "pos_customer_types", "Company")
+
+		# Another worker's save clears Redis only, not this job's local cache
+		cache = frappe.cache()
+		cache.delete(cache.make_key(SNAPSHOT_KEY), cache.make_key(VERSION_KEY))
+
+		self.assertEqual(get_settings().pos_customer_types, ("Company",))
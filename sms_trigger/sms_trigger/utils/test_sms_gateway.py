@@ -0,0 +1,105 @@
+# Copyright (c) 2025, primetechbd and Contributors
+# See license.txt
+
+import random
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from sms_trigger.sms_trigger.utils.dispatch import send_grouped
+from sms_trigger.sms_trigger.utils.gateway_adapters import MockAdapter
+from sms_trigger.sms_trigger.utils.phone import INVALID_NUMBER_ERROR
+from sms_trigger.sms_trigger.utils.rate_limiter import get_limits
+from sms_trigger.sms_trigger.utils.sms_gateway import group_by_message, send_chunk, send_sms_batch
+
+TEST_SETTINGS = {
+	"gateway_adapter": "Mock",
+	"async_dispatch": 0,
+	"gateway_batch_size": 2,
+	"sms_rate_limit_per_second": 1000,
+}
+
+
+def make_numbers(count):
+	"""Fresh numbers, so the per-number limit never carries over between runs"""
+	prefix = random.randint(0, 9999)
+	return [f"+88017{prefix:04d}{idx:04d}" for idx in range(count)]
+
+
+def get_logged_numbers(mobile_nos):
+	"""Numbers of `mobile_nos` that appear in an SMS Log"""
+	return {
+		mobile_no for mobile_no in mobile_nos
+		if frappe.db.exists("SMS Log", {"sent_to": ["like", f"%{mobile_no.lstrip('+')}%"]})
+	}
+
+
+class MockGatewayTestCase(FrappeTestCase):
+	"""Sends through the Mock adapter, which accepts every message without leaving the process"""
+
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		settings = frappe.get_single("SMS Trigger Settings")
+		cls.previous_settings = {field: settings.get(field) for field in TEST_SETTINGS}
+		settings.update(TEST_SETTINGS)
+		settings.save()
+
+	@classmethod
+	def tearDownClass(cls):
+		settings = frappe.get_single("SMS Trigger Settings")
+		settings.update(cls.previous_settings)
+		settings.save()
+		super().tearDownClass()
+
+
+class TestSMSGateway(MockGatewayTestCase):
+	def test_send_chunk_logs_delivery(self):
+		receivers = [mobile_no.lstrip("+") for mobile_no in make_numbers(2)]
+		result = send_chunk(receivers, "Chunk test")
+
+		self.assertTrue(result["success"])
+		log = frappe.get_last_doc("SMS Log")
+		self.assertEqual(log.message, "Chunk test")
+		self.assertEqual(log.sent_to.splitlines(), receivers)
+		self.assertEqual(log.no_of_requested_sms, 2)
+
+	def test_send_sms_batch(self):
+		mobile_nos = [*make_numbers(3), "12"]
+		results = send_sms_batch(mobile_nos, "Batch test")
+
+		self.assertEqual(len(results), 4)
+		self.assertTrue(all(result["success"] for result in results[:3]))
+		self.assertFalse(results[3]["success"])
+		self.assertEqual(results[3]["error"], INVALID_NUMBER_ERROR)
+		self.assertEqual(get_logged_numbers(mobile_nos[:3]), set(mobile_nos[:3]))
+
+	def test_send_grouped(self):
+		items = [frappe._dict(mobile_no=mobile_no, message=f"Grouped {idx % 2}")
+			for idx, mobile_no in enumerate(make_numbers(5))]
+		chunks = group_by_message(items, lambda item: item.message)
+
+		sent = {}
+		for (message, chunk), results in send_grouped(chunks, lambda item: item.mobile_no):
+			self.assertEqual(len(results), len(chunk))
+			for item, result in zip(chunk, results, strict=True):
+				self.assertEqual(item.message, message)
+				sent[item.mobile_no] = result["success"]
+
+		self.assertEqual(sent, {item.mobile_no: True for item in items})
+		self.assertEqual(get_logged_numbers(sent), set(sent))
+
+	def test_failed_send_releases_number_limit(self):
+		[mobile_no] = make_numbers(1)
+		receiver = mobile_no.lstrip("+")
+
+		with patch.object(MockAdapter, "send", return_value=503):
+			[result] = send_sms_batch([mobile_no], "Failing test")
+		self.assertFalse(result["success"])
+		self.assertTrue(result["retryable"])
+		self.assertEqual(get_limits()["number"].count(receiver), 0)
+
+		[result] = send_sms_batch([mobile_no], "Passing test")
+		self.assertTrue(result["success"])
+		self.assertEqual(get_limits()["number"].count(receiver), 1)
@@ -0,0 +1,93 @@
+# Copyright (c) 2025, primetechbd and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.utils import add_days, get_datetime, now_datetime
+
+from sms_trigger.sms_trigger.utils.gateway_adapters import MockAdapter
+from sms_trigger.sms_trigger.utils.test_sms_gateway import MockGatewayTestCase, make_numbers
+from sms_trigger.sms_trigger.utils.trigger_engine import (
+	claim_pending_sms,
+	create_scheduled_sms_bulk,
+	drain_pending_sms,
+)
+
+TEST_CUSTOMER = "_Test SMS Drain Customer"
+# Older than anything else in the outbox, so these rows are claimed first
+DUE_DATETIME = "2000-01-01 00:00:00"
+
+
+class TestPendingSMSDrain(MockGatewayTestCase):
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		cls.customer = frappe.db.get_value("Customer", {"customer_name": TEST_CUSTOMER})
+		if not cls.customer:
+			cls.customer = frappe.get_doc({
+				"doctype": "Customer",
+				"customer_name": TEST_CUSTOMER,
+				"customer_type": "Individual",
+			}).insert(ignore_permissions=True).name
+
+	def setUp(self):
+		self.clear_scheduled_sms()
+
+	def tearDown(self):
+		self.clear_scheduled_sms()
+
+	def clear_scheduled_sms(self):
+		# The outbox commits on every claim, so rows are removed explicitly
+		frappe.db.delete("Scheduled SMS", {"customer": self.customer})
+		frappe.db.commit()
+
+	def make_scheduled_sms(self, count, scheduled_datetime=DUE_DATETIME):
+		create_scheduled_sms_bulk([
+			{"customer": self.customer, "mobile_no": mobile_no, "message": "Drain test",
+				"trigger_type": "Custom", "scheduled_datetime": scheduled_datetime}
+			for mobile_no in make_numbers(count)
+		])
+
+	def get_scheduled_sms(self):
+		return frappe.get_all("Scheduled SMS", filters={"customer": self.customer},
+			fields=["name", "status", "attempts", "claim_token", "next_attempt_at", "error_message"])
+
+	def test_claims_do_not_overlap(self):
+		self.make_scheduled_sms(3)
+
+		first = {sms.name for sms in claim_pending_sms(2)}
+		second = {sms.name for sms in claim_pending_sms(2)}
+		self.assertEqual(len(first), 2)
+		self.assertFalse(first & second)
+
+		ours = self.get_scheduled_sms()
+		self.assertTrue({sms.name for sms in ours} <= first | second)
+		self.assertEqual({sms.status for sms in ours}, {"Sending"})
+
+		# Claimed rows are not due anymore
+		self.assertFalse({sms.name for sms in ours} & {sms.name for sms in claim_pending_sms(10)})
+
+	def test_drain_sends_due_sms(self):
+		self.make_scheduled_sms(5)
+		self.make_scheduled_sms(1, scheduled_datetime=add_days(now_datetime(), 1))
+
+		drain_pending_sms(batch_size=2, max_seconds=60)
+
+		statuses = sorted((sms.status, sms.attempts, sms.claim_token) for sms in self.get_scheduled_sms())
+		self.assertEqual(statuses, [("Draft", 0, None)] + [("Sent", 1, None)] * 5)
+
+	def test_retryable_failure_is_rescheduled(self):
+		self.make_scheduled_sms(2)
+
+		with patch.object(MockAdapter, "send", return_value=503):
+			drain_pending_sms(batch_size=10, max_seconds=60)
+
+		for sms in self.get_scheduled_sms():
+			self.assertEqual((sms.status, sms.attempts), ("Draft", 1))
+			self.assertGreater(get_datetime(sms.next_attempt_at), now_datetime())
+			self.assertIn("503", sms.error_message)
+
+		# Not due again until the backoff has elapsed
+		drain_pending_sms(batch_size=10, max_seconds=60)
+		self.assertEqual({(sms.status, sms.attempts) for sms in self.get_scheduled_sms()}, {("Draft", 1)})
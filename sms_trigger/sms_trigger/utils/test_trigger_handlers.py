@@ -0,0 +1,134 @@
+# Copyright (c) 2025, primetechbd and Contributors
+# See license.txt
+
+import json
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, getdate
+
+from sms_trigger.sms_trigger.utils.trigger_engine import run_trigger_rule
+from sms_trigger.sms_trigger.utils.trigger_handlers import (
+	InvoiceDueHandler,
+	RepurchasePromotionHandler,
+	get_handler,
+)
+
+TEST_CUSTOMERS = {
+	"_Test SMS Trigger Customer 1": "+8801712345601",
+	"_Test SMS Trigger Customer 2": "+8801712345602",
+}
+
+
+class TestTriggerHandlers(FrappeTestCase):
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		cls.customers = []
+		cls.mobile_nos = {}
+		for customer_name, mobile_no in TEST_CUSTOMERS.items():
+			name = frappe.db.get_value("Customer", {"customer_name": customer_name})
+			if not name:
+				name = frappe.get_doc({
+					"doctype": "Customer",
+					"customer_name": customer_name,
+					"customer_type": "Individual",
+					"mobile_no": mobile_no,
+				}).insert(ignore_permissions=True).name
+			cls.customers.append(name)
+			cls.mobile_nos[name] = mobile_no
+
+	def setUp(self):
+		# Birthday today, no purchase since the follow-up window
+		for name in self.customers:
+			customer = frappe.get_doc("Customer", name)
+			customer.date_of_birth = getdate().replace(year=2000)
+			customer.sms_enabled = 1
+			customer.save(ignore_permissions=True)
+			frappe.db.set_value("Customer", name, "last_purchase_date", None)
+		self.clear_scheduled_sms()
+
+	def tearDown(self):
+		self.clear_scheduled_sms()
+
+	def clear_scheduled_sms(self):
+		# Scheduled SMS are inserted and committed in bulk, outside the test transaction
+		frappe.db.delete("Scheduled SMS", {"customer": ["in", self.customers]})
+		frappe.db.commit()
+
+	def make_rule(self, trigger_type, **kwargs):
+		return frappe._dict(
+			name=None,
+			trigger_type=trigger_type,
+			message_template="Hello {{ customer_name }}",
+			use_json=1,
+			conditions=json.dumps({"name": ["In", self.customers]}),
+			days_interval=None,
+			days_before=0,
+			last_execution=None,
+			**kwargs
+		)
+
+	def get_scheduled(self, trigger_type):
+		return frappe.get_all("Scheduled SMS",
+			filters={"trigger_type": trigger_type, "customer": ["in", self.customers]},
+			fields=["customer", "mobile_no", "reference_doctype", "reference_name"]
+		)
+
+	def assert_one_sms_per_customer(self, rule):
+		candidates = get_handler(rule).get_candidates()
+		self.assertEqual(sorted(get_handler(rule).get_dedup_key(c) for c in candidates), sorted(self.customers))
+
+		self.assertEqual(run_trigger_rule(rule), (2, 2))
+		scheduled = self.get_scheduled(rule.trigger_type)
+		self.assertEqual(sorted(sms.customer for sms in scheduled), sorted(self.customers))
+		self.assertEqual({sms.mobile_no for sms in scheduled}, set(self.mobile_nos.values()))
+
+		# A second run finds every customer already scheduled
+		self.assertEqual(run_trigger_rule(rule), (2, 0))
+
+	def test_customer_filter(self):
+		self.assert_one_sms_per_customer(self.make_rule("Customer Group"))
+
+	def test_birthday(self):
+		self.assert_one_sms_per_customer(self.make_rule("Birthday"))
+
+	def test_inactive_customer(self):
+		self.assert_one_sms_per_customer(self.make_rule("Inactive Customer", days_interval=90))
+
+	def test_follow_up(self):
+		for name in self.customers:
+			frappe.db.set_value("Customer", name, "last_purchase_date", add_days(getdate(), -7))
+		self.assert_one_sms_per_customer(self.make_rule("Follow-up", days_interval=7))
+
+	def test_repurchase_promotion(self):
+		# One row per invoice line the query would return, the customer bought the item twice
+		candidates = [
+			frappe._dict(customer=name, customer_name=name, mobile_no=self.mobile_nos[name], last_purchase_date=getdate())
+			for name in self.customers + self.customers[:1]
+		]
+		rule = self.make_rule("Repurchase Promotion")
+		with patch.object(RepurchasePromotionHandler, "get_candidates", return_value=candidates):
+			self.assertEqual(run_trigger_rule(rule), (3, 2))
+			self.assertEqual(sorted(sms.customer for sms in self.get_scheduled(rule.trigger_type)), sorted(self.customers))
+			self.assertEqual(run_trigger_rule(rule), (3, 0))
+
+	def test_invoice_due(self):
+		# The first customer has two overdue invoices, each gets its own SMS
+		invoices = ["_T-SINV-SMS-1", "_T-SINV-SMS-2", "_T-SINV-SMS-3"]
+		candidates = [
+			frappe._dict(customer=name, invoice=invoice, due_date=getdate(), outstanding_amount=100,
+				customer_name=name, mobile_no=self.mobile_nos[name])
+			for name, invoice in zip(self.customers + self.customers[:1], invoices, strict=True)
+		]
+		rule = self.make_rule("Invoice Due")
+		with patch.object(InvoiceDueHandler, "get_candidates", return_value=candidates):
+			self.assertEqual(run_trigger_rule(rule), (3, 3))
+			scheduled = self.get_scheduled(rule.trigger_type)
+			self.assertEqual(
+				sorted((sms.reference_name, sms.customer) for sms in scheduled),
+				[(c.invoice, c.customer) for c in candidates],
+			)
+			self.assertEqual({sms.reference_doctype for sms in scheduled}, {"Sales Invoice"})
+			self.assertEqual(run_trigger_rule(rule), (3, 0))
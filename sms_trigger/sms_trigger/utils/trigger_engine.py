@@ -1,321 +1,134 @@
 import frappe
-from frappe.utils import add_days, getdate, now_datetime, get_datetime, cstr
-import json
+from frappe.utils import add_days, add_to_date, cint, getdate, now_datetime, get_datetime, cstr
+import time
+from sms_trigger.sms_trigger.utils.lanes import BULK, TRANSACTIONAL, enqueue_transactional_drain
+from sms_trigger.sms_trigger.utils.settings import get_settings
 
 def process_sms_triggers():
-	"""Main function to process all SMS trigger rules"""
+	"""Main function to process all SMS trigger rules.
+
+	Every due rule runs in its own background job, so a slow or failing rule
+	neither delays nor aborts the others.
+	"""
 	try:
 		rules = frappe.get_all("SMS Trigger Rule", 
 			filters={"is_active": 1, "docstatus": 1}, 
-			fields=["name", "trigger_type", "conditions", "message_template", "days_interval", "frequency"]
+			pluck="name"
 		)
 		
-		for rule_data in rules:
+		settings = get_settings()
+		for rule_name in rules:
 			try:
-				rule = frappe.get_doc("SMS Trigger Rule", rule_data.name)
+				rule = frappe.get_doc("SMS Trigger Rule", rule_name)
 				if rule.can_execute():
-					process_trigger_rule(rule)
-					rule.mark_executed()
+					frappe.enqueue(
+						"sms_trigger.sms_trigger.utils.trigger_engine.run_rule_job",
+						rule_name=rule_name,
+						queue=settings.trigger_rule_queue or "long",
+						timeout=cint(settings.trigger_rule_timeout) or 1500,
+						job_id=f"sms_trigger_rule::{rule_name}",
+						deduplicate=True
+					)
 			except Exception as e:
-				frappe.log_error(f"Error processing rule {rule_data.name}: {str(e)}", "SMS Trigger Error")
+				frappe.log_error(f"Error processing rule {rule_name}: {e}", "SMS Trigger Error")
 	except Exception as e:
 		frappe.log_error(f"Error in process_sms_triggers: {str(e)}", "SMS Trigger Error")
 
+def run_rule_job(rule_name):
+	"""Background job running one rule, recording its duration and counts on the rule"""
+	rule = frappe.get_doc("SMS Trigger Rule", rule_name)
+	# Checked again, the rule may have run or changed since it was queued
+	if not rule.can_execute():
+		return
+
+	start = time.perf_counter()
+	try:
+		candidates, scheduled = process_trigger_rule(rule)
+	except Exception as e:
+		frappe.db.rollback()
+		frappe.log_error(f"Error processing rule {rule_name}: {e}", "SMS Trigger Error")
+		rule.db_set({
+			"error_count": cint(rule.error_count) + 1,
+			"last_error": now_datetime(),
+			"last_duration": round(time.perf_counter() - start, 3),
+		}, update_modified=False)
+		frappe.db.commit()
+		return
+
+	rule.mark_executed(
+		duration=round(time.perf_counter() - start, 3),
+		candidates=candidates,
+		scheduled=scheduled
+	)
+	frappe.db.commit()
+
+# Candidates are deduplicated, rendered and inserted in batches of this size
+TRIGGER_BATCH_SIZE = 1000
+
 def process_trigger_rule(rule):
 	"""Process individual trigger rule"""
-	trigger_type = rule.trigger_type
-	
-	if trigger_type == "Invoice Due":
-		process_invoice_due(rule)
-	elif trigger_type == "Birthday":
-		process_birthday(rule)
-	elif trigger_type == "Inactive Customer":
-		process_inactive_customer(rule)
-	elif trigger_type == "Repurchase Promotion":
-		process_repurchase_promotion(rule)
-	elif trigger_type == "Customer Type":
-		process_customer_type(rule)
-	elif trigger_type == "Customer Group":
-		process_customer_group(rule)
-
-def get_filters_from_rule(rule):
-	"""Build filters from rule conditions (JSON or Table)"""
-	filters = []
-	
-	# Handle Visual Builder (Table)
-	if not rule.use_json and rule.condition_table:
-		for row in rule.condition_table:
-			filters.append([row.field, row.operator, row.value])
-			
-	# Handle JSON (Advanced or Legacy)
-	elif rule.conditions:
-		try:
-			conditions = json.loads(rule.conditions)
-			if isinstance(conditions, dict):
-				# Convert simple dict to filter list
-				for key, value in conditions.items():
-					# Skip special keys handled separately (like customer_type in its specific handler)
-					if key in ["customer_type", "customer_group", "item_code"]:
-						continue
-					filters.append([key, "=", value])
-		except:
-			pass
-			
-	return filters
-
-def process_customer_type(rule):
-	"""Process customer type based triggers"""
-	# Get base filters from rule
-	filters = get_filters_from_rule(rule)
-	
-	# Add mandatory filters
-	filters.append(["mobile_no", "!=", ""])
-	filters.append(["sms_enabled", "!=", 0])
-	
-	# Handle special 'customer_type' field from JSON or Table
-	# If using JSON, we need to extract customer_type specifically if it exists there
-	if rule.use_json and rule.conditions:
-		try:
-			cond = json.loads(rule.conditions)
-			if cond.get("customer_type"):
-				filters.append(["customer_type", "=", cond.get("customer_type")])
-		except:
-			pass
-			
-	# Note: For Visual Builder, user should add "Customer Type" = "Individual" row explicitly
-	
-	customers = frappe.get_all("Customer", 
-		filters=filters,
-		fields=["name", "customer_name", "mobile_no"]
-	)
-	
-def process_invoice_due(rule):
-	"""Process overdue invoices"""
-	days_overdue = rule.days_interval or 7
-	due_date = add_days(getdate(), -days_overdue)
-	
-	invoices = frappe.db.sql("""
-		SELECT si.customer, si.name, si.due_date, si.outstanding_amount, c.mobile_no
-		FROM `tabSales Invoice` si
-		JOIN `tabCustomer` c ON c.name = si.customer
-		WHERE si.docstatus = 1 
-		AND si.outstanding_amount > 0
-		AND si.due_date <= %s
-		AND c.mobile_no IS NOT NULL
-		AND c.mobile_no != ''
-		AND IFNULL(c.sms_enabled, 1) = 1
-	""", (due_date,), as_dict=True)
-	
-	for invoice in invoices:
-		existing = frappe.db.exists("Scheduled SMS", {
-			"customer": invoice.customer,
-			"reference_doctype": "Sales Invoice",
-			"reference_name": invoice.name,
-			"trigger_type": "Invoice Due"
-		})
-		
-		if not existing:
-			try:
-				customer_name = frappe.get_value("Customer", invoice.customer, "customer_name")
-				context = {
-					"customer_name": customer_name,
-					"invoice_no": invoice.name,
-					"amount": invoice.outstanding_amount,
-					"today": frappe.utils.today(),
-				}
-				message = frappe.render_template(rule.message_template, context)
-				create_scheduled_sms(
-					customer=invoice.customer,
-					message=message,
-					trigger_type="Invoice Due",
-					reference_doctype="Sales Invoice",
-					reference_name=invoice.name
-				)
-			except Exception as e:
-				frappe.log_error(f"Error formatting invoice due message for {invoice.name}: {str(e)}", "SMS Trigger Error")
+	return run_trigger_rule(rule)
 
-def process_birthday(rule):
-	"""Process customer birthdays"""
-	today = getdate()
-	
-	customers = frappe.db.sql("""
-		SELECT name, customer_name, mobile_no
-		FROM `tabCustomer`
-		WHERE DATE_FORMAT(date_of_birth, '%%m-%%d') = %s
-		AND mobile_no IS NOT NULL
-		AND mobile_no != ''
-		AND IFNULL(sms_enabled, 1) = 1
-	""", (today.strftime('%m-%d'),), as_dict=True)
-	
-	for customer in customers:
-		existing = frappe.db.exists("Scheduled SMS", {
-			"customer": customer.name,
-			"trigger_type": "Birthday",
-			"scheduled_datetime": [">=", today]
-		})
-		
-		if not existing:
-			try:
-				context = {
-					"customer_name": customer.customer_name,
-					"today": frappe.utils.today(),
-				}
-				message = frappe.render_template(rule.message_template, context)
-				create_scheduled_sms(
-					customer=customer.name,
-					message=message,
-					trigger_type="Birthday"
-				)
-			except Exception as e:
-				frappe.log_error(f"Error formatting birthday message for customer {customer.name}: {str(e)}", "SMS Trigger Error")
+def run_trigger_rule(rule):
+	"""Shared pipeline for every trigger type: query, dedup, render and bulk insert.
 
-def process_inactive_customer(rule):
-	"""Process inactive customers"""
-	days_inactive = rule.days_interval or 90
-	cutoff_date = add_days(getdate(), -days_inactive)
-	
-	customers = frappe.db.sql("""
-		SELECT DISTINCT c.name, c.customer_name, c.mobile_no
-		FROM `tabCustomer` c
-		WHERE c.mobile_no IS NOT NULL
-		AND c.mobile_no != ''
-		AND IFNULL(c.sms_enabled, 1) = 1
-		AND NOT EXISTS (
-			SELECT 1
-			FROM `tabSales Invoice` si
-			WHERE si.customer = c.name
-			AND si.docstatus = 1
-			AND si.posting_date >= %s
-		)
-	""", (cutoff_date,), as_dict=True)
-	
-	for customer in customers:
-		existing = frappe.db.exists("Scheduled SMS", {
-			"customer": customer.name,
-			"trigger_type": "Inactive Customer",
-			"scheduled_datetime": [">=", add_days(getdate(), -30)]
-		})
-		
-		if not existing:
-			try:
-				context = {
-					"customer_name": customer.customer_name,
-					"today": frappe.utils.today(),
-				}
-				message = frappe.render_template(rule.message_template, context)
-				create_scheduled_sms(
-					customer=customer.name,
-					message=message,
-					trigger_type="Inactive Customer"
-				)
-			except Exception as e:
-				frappe.log_error(f"Error formatting inactive customer message for {customer.name}: {str(e)}", "SMS Trigger Error")
+	Returns `(candidates, scheduled)` counts.
+	"""
+	from sms_trigger.sms_trigger.utils.template_cache import render_many
+	from sms_trigger.sms_trigger.utils.trigger_handlers import get_handler
 
-def process_repurchase_promotion(rule):
-	"""Process repurchase promotion"""
-	item_code = None
-	
-	# Try extracting item_code from JSON
-	if rule.use_json and rule.conditions:
-		try:
-			conditions = json.loads(rule.conditions)
-			item_code = conditions.get("item_code")
-		except:
-			pass
-			
-	# Try extracting item_code from Visual Builder
-	if not item_code and rule.condition_table:
-		for row in rule.condition_table:
-			if row.field == "item_code" and row.operator == "Equals":
-				item_code = row.value
-				break
-	
-	if not item_code:
-		return
-	
-	days_ago = rule.days_interval or 30
-	cutoff_date = add_days(getdate(), -days_ago)
-	
-	customers = frappe.db.sql("""
-		SELECT DISTINCT si.customer, c.customer_name, c.mobile_no
-		FROM `tabSales Invoice` si
-		JOIN `tabSales Invoice Item` sii ON sii.parent = si.name
-		JOIN `tabCustomer` c ON c.name = si.customer
-		WHERE sii.item_code = %s
-		AND si.posting_date >= %s
-		AND c.mobile_no IS NOT NULL
-		AND c.mobile_no != ''
-		AND IFNULL(c.sms_enabled, 1) = 1
-	""", (item_code, cutoff_date), as_dict=True)
-	
-	for customer in customers:
-		existing = frappe.db.exists("Scheduled SMS", {
-			"customer": customer.customer,
-			"trigger_type": "Repurchase Promotion",
-			"scheduled_datetime": [">=", add_days(getdate(), -7)]
-		})
-		
-		if not existing:
-			try:
-				context = {
-					"customer_name": customer.customer_name,
-					"item_code": item_code,
-					"today": frappe.utils.today(),
-				}
-				message = frappe.render_template(rule.message_template, context)
-				create_scheduled_sms(
-					customer=customer.customer,
-					message=message,
-					trigger_type="Repurchase Promotion"
-				)
-			except Exception as e:
-				frappe.log_error(f"Error formatting message for customer {customer.customer}: {str(e)}", "SMS Trigger Error")
+	handler = get_handler(rule)
+	if not handler:
+		return 0, 0
 
-def process_customer_group(rule):
-	"""Process customer group based triggers"""
-	# Get base filters from rule
-	filters = get_filters_from_rule(rule)
-	
-	# Add mandatory filters
-	filters.append(["mobile_no", "!=", ""])
-	filters.append(["sms_enabled", "!=", 0])
+	candidates = handler.get_candidates()
+	scheduled = handler.get_scheduled_keys(candidates)
+
+	created = 0
+	for start in range(0, len(candidates), TRIGGER_BATCH_SIZE):
+		batch = []
+		for candidate in candidates[start:start + TRIGGER_BATCH_SIZE]:
+			key = handler.get_dedup_key(candidate)
+			if key in scheduled:
+				continue
+			scheduled.add(key)
+			batch.append(candidate)
+		
+		def on_render_error(idx, error):
+			frappe.log_error(f"Error formatting {rule.trigger_type} message for customer {batch[idx].customer}: {error}", "SMS Trigger Error")
+		
+		messages = render_many(rule.message_template, [handler.get_context(c) for c in batch], on_error=on_render_error)
+		created += create_scheduled_sms_bulk([
+			frappe._dict(
+				customer=candidate.customer,
+				mobile_no=candidate.mobile_no,
+				message=message,
+				trigger_type=rule.trigger_type,
+				reference_doctype=handler.reference_doctype,
+				reference_name=handler.get_reference_name(candidate)
+			)
+			for candidate, message in zip(batch, messages, strict=True) if message is not None
+		])
 	
-	# Handle special 'customer_group' field from JSON or Table
-	if rule.use_json and rule.conditions:
-		try:
-			cond = json.loads(rule.conditions)
-			if cond.get("customer_group"):
-				filters.append(["customer_group", "=", cond.get("customer_group")])
-		except:
-			pass
-			
-	customers = frappe.get_all("Customer", 
-		filters=filters,
-		fields=["name", "customer_name", "mobile_no"]
-	)
+	return len(candidates), created
+
+def count_rule_candidates(rule):
+	"""Number of customers (or invoices) the rule currently matches, for a dry run"""
+	from sms_trigger.sms_trigger.utils.trigger_handlers import get_handler
 	
-	for customer in customers:
-		existing = frappe.db.exists("Scheduled SMS", {
-			"customer": customer.name,
-			"trigger_type": "Customer Group",
-			"scheduled_datetime": [">=", add_days(getdate(), -30)]
-		})
-		
-		if not existing:
-			try:
-				context = {
-					"customer_name": customer.customer_name,
-					"today": frappe.utils.today(),
-				}
-				message = frappe.render_template(rule.message_template, context)
-				create_scheduled_sms(
-					customer=customer.name,
-					message=message,
-					trigger_type="Customer Group"
-				)
-			except Exception as e:
-				frappe.log_error(f"Error formatting message for customer {customer.name}: {str(e)}", "SMS Trigger Error")
+	handler = get_handler(rule)
+	return handler.count_candidates() if handler else 0
+
+def get_scheduled_customers(trigger_type, since):
+	"""Customers that already have an SMS of `trigger_type` scheduled since `since`.
 
+	Fetched once per rule run so handlers can dedup candidates against a set
+	instead of running one exists() query per customer.
+	"""
+	return set(frappe.get_all("Scheduled SMS",
+		filters={"trigger_type": trigger_type, "scheduled_datetime": [">=", since]},
+		pluck="customer"
+	))
 
 def create_scheduled_sms(customer, message, trigger_type, reference_doctype=None, reference_name=None, scheduled_datetime=None):
 	"""Create scheduled SMS entry"""
@@ -323,7 +136,7 @@ def create_scheduled_sms(customer, message, trigger_type, reference_doctype=None
 		if not scheduled_datetime:
 			scheduled_datetime = now_datetime()
 		
-		mobile_no = frappe.get_value("Customer", customer, "mobile_no")
+		mobile_no = frappe.get_value("Customer", customer, "normalized_mobile_no")
 		if not mobile_no:
 			frappe.log_error(f"Customer {customer} has no mobile number", "SMS Trigger Error")
 			return None
@@ -346,48 +159,200 @@ def create_scheduled_sms(customer, message, trigger_type, reference_doctype=None
 		frappe.log_error(f"Error creating scheduled SMS for customer {customer}: {str(e)}", "SMS Trigger Error")
 		return None
 
+def create_scheduled_sms_bulk(messages, chunk_size=500):
+	"""Create submitted Scheduled SMS entries in bulk.
+
+	`messages` is a list of dicts with the same keys as `create_scheduled_sms`
+	(plus an optional `mobile_no`). Rows are validated and named like a regular
+	insert, then written with one multi-row INSERT and one commit per chunk.
+	Returns the number of rows created.
+	"""
+	from frappe.model.naming import make_autoname
+
+	if not messages:
+		return 0
+
+	# Fetch missing mobile numbers in one query instead of one per row
+	missing = list({m["customer"] for m in messages if not m.get("mobile_no")})
+	mobile_nos = {}
+	for start in range(0, len(missing), chunk_size):
+		mobile_nos.update(frappe.get_all("Customer",
+			filters={"name": ["in", missing[start:start + chunk_size]]},
+			fields=["name", "normalized_mobile_no"],
+			as_list=True
+		))
+
+	now = now_datetime()
+	user = frappe.session.user
+	fields = [
+		"name", "owner", "modified_by", "creation", "modified", "docstatus", "status",
+		"customer", "mobile_no", "message", "trigger_type", "scheduled_datetime",
+		"reference_doctype", "reference_name", "attempts", "next_attempt_at", "lane"
+	]
+
+	rows = []
+	for m in messages:
+		mobile_no = m.get("mobile_no") or mobile_nos.get(m["customer"])
+		if not mobile_no:
+			frappe.log_error(f"Customer {m['customer']} has no mobile number", "SMS Trigger Error")
+			continue
+		if not m.get("message"):
+			frappe.log_error(f"Empty message for customer {m['customer']}", "SMS Trigger Error")
+			continue
+
+		rows.append((
+			make_autoname("hash", "Scheduled SMS"), user, user, now, now, 1, "Draft",
+			m["customer"], mobile_no, m["message"], m.get("trigger_type"),
+			m.get("scheduled_datetime") or now,
+			m.get("reference_doctype"), m.get("reference_name"),
+			cint(m.get("attempts")), m.get("next_attempt_at"), m.get("lane") or BULK
+		))
+
+	created = 0
+	for start in range(0, len(rows), chunk_size):
+		chunk = rows[start:start + chunk_size]
+		try:
+			frappe.db.bulk_insert("Scheduled SMS", fields, chunk)
+			frappe.db.commit()
+			created += len(chunk)
+		except Exception as e:
+			frappe.db.rollback()
+			frappe.log_error(f"Error creating {len(chunk)} scheduled SMS: {e}", "SMS Trigger Error")
+
+	return created
+
+# A drain job stops claiming new batches after this long, the next run takes over
+PENDING_SMS_DRAIN_SECONDS = 540
+# Claimed rows without a result after this long belong to a worker that died
+PENDING_SMS_CLAIM_TIMEOUT = 1800
+# Drafts that are due, including retries whose backoff has elapsed
+DUE_SMS_CONDITION = """status = 'Draft' AND docstatus = 1 AND scheduled_datetime <= %(now)s
+	AND (next_attempt_at IS NULL OR next_attempt_at <= %(now)s)"""
+
 def send_pending_sms():
-	"""Send pending SMS messages"""
+	"""Fan due bulk lane Scheduled SMS out to parallel drain jobs (scheduled job)"""
 	try:
-		pending_sms = frappe.get_all("Scheduled SMS", 
-			filters={
-				"status": "Draft",
-				"docstatus": 1,
-				"scheduled_datetime": ["<=", now_datetime()]
-			},
-			fields=["name"],
-			limit=100
-		)
+		release_stale_claims()
 		
-		for sms_data in pending_sms:
-			try:
-				sms = frappe.get_doc("Scheduled SMS", sms_data.name)
-				result = sms.send_sms()
-				
-				# Reload and commit to ensure status is saved
-				sms.reload()
-				frappe.db.commit()
-				
-				if result.get("success"):
-					frappe.log_info(f"SMS {sms_data.name} sent successfully", "SMS Send")
-				else:
-					frappe.log_error(f"SMS {sms_data.name} failed: {result.get('error')}", "SMS Send Error")
-					
-			except Exception as e:
-				frappe.log_error(f"Error sending SMS {sms_data.name}: {str(e)}", "SMS Send Error")
-				# Try to mark as failed
-				try:
-					sms = frappe.get_doc("Scheduled SMS", sms_data.name)
-					sms.status = "Failed"
-					sms.error_message = str(e)
-					sms.save(ignore_permissions=True, ignore_version=True)
-					frappe.db.commit()
-				except:
-					pass
-					
+		if not frappe.db.sql(f"""
+			SELECT name FROM `tabScheduled SMS`
+			WHERE {DUE_SMS_CONDITION} AND lane = %(lane)s
+			LIMIT 1
+		""", {"now": now_datetime(), "lane": BULK}):
+			return
+
+		# Bulk drains stay off the short queue, which transactional drains use
+		workers = cint(get_settings().pending_sms_workers) or 2
+		for _ in range(workers):
+			frappe.enqueue(
+				"sms_trigger.sms_trigger.utils.trigger_engine.drain_pending_sms",
+				queue="long",
+				timeout=PENDING_SMS_DRAIN_SECONDS + 60
+			)
 	except Exception as e:
 		frappe.log_error(f"Error in send_pending_sms: {str(e)}", "SMS Send Error")
 
+def send_transactional_sms():
+	"""Drain the transactional lane if anything in it is due (scheduled job).
+
+	Transactional messages are normally sent the moment they are created, this
+	picks up whatever that missed, such as retries.
+	"""
+	if frappe.db.sql(f"""
+		SELECT name FROM `tabScheduled SMS`
+		WHERE {DUE_SMS_CONDITION} AND lane = %(lane)s
+		LIMIT 1
+	""", {"now": now_datetime(), "lane": TRANSACTIONAL}):
+		enqueue_transactional_drain()
+
+def drain_pending_sms(batch_size=None, max_seconds=PENDING_SMS_DRAIN_SECONDS, lane=BULK):
+	"""Claim and send due Scheduled SMS of `lane` until the backlog is empty.
+
+	Rows are claimed with a single UPDATE, so any number of drain jobs can run
+	side by side without picking the same row twice. The batch size doubles
+	while claims come back full, up to ten times the configured size.
+	"""
+	base_size = cint(batch_size or get_settings().pending_sms_batch_size) or 100
+	size = base_size
+	deadline = time.monotonic() + max_seconds
+	sent = 0
+
+	while time.monotonic() < deadline:
+		claimed = claim_pending_sms(size, lane)
+		if not claimed:
+			break
+
+		try:
+			send_claimed_sms(claimed, lane)
+		except Exception as e:
+			frappe.db.rollback()
+			frappe.log_error(f"Error in drain_pending_sms: {e}", "SMS Send Error")
+			break
+
+		sent += len(claimed)
+		size = min(size * 2, base_size * 10) if len(claimed) >= size else base_size
+
+	return sent
+
+def claim_pending_sms(limit, lane=BULK):
+	"""Atomically claim up to `limit` due Scheduled SMS of `lane` for this worker"""
+	token = frappe.generate_hash(length=20)
+	frappe.db.sql(f"""
+		UPDATE `tabScheduled SMS`
+		SET status = 'Sending', claim_token = %(token)s, claimed_at = %(now)s
+		WHERE {DUE_SMS_CONDITION} AND lane = %(lane)s
+		ORDER BY scheduled_datetime
+		LIMIT %(limit)s
+	""", {"token": token, "now": now_datetime(), "lane": lane, "limit": cint(limit)})
+	frappe.db.commit()
+
+	return frappe.get_all("Scheduled SMS",
+		filters={"claim_token": token},
+		fields=["name", "mobile_no", "message", "attempts", "reference_doctype", "reference_name"]
+	)
+
+def send_claimed_sms(claimed, lane=BULK):
+	"""Send a claimed batch and record each result"""
+	from sms_trigger.sms_trigger.utils.dispatch import send_grouped
+	from sms_trigger.sms_trigger.utils.retry import get_retry_settings
+	from sms_trigger.sms_trigger.utils.sms_gateway import group_by_message
+
+	retry_settings = get_retry_settings()
+
+	# Identical messages go out together, one gateway request per chunk
+	chunks = group_by_message(claimed, lambda sms: sms.message)
+	for (_message, chunk), results in send_grouped(chunks, lambda sms: sms.mobile_no, lane):
+		for sms, result in zip(chunk, results, strict=True):
+			set_scheduled_sms_result(sms, result, retry_settings)
+			if not result.get("success") and not result.get("retryable"):
+				frappe.log_error(f"SMS {sms.name} failed: {result.get('error')}", "SMS Send Error")
+
+		frappe.db.commit()
+
+def set_scheduled_sms_result(sms, result, retry_settings=None):
+	from sms_trigger.sms_trigger.utils.retry import get_result_values
+
+	values = get_result_values(result, cint(sms.attempts) + 1, retry_settings)
+	values["claim_token"] = None
+	frappe.db.set_value("Scheduled SMS", sms.name, values)
+
+	if values["status"] == "Sent" and sms.reference_doctype == "Bulk SMS Recipient":
+		from sms_trigger.sms_trigger.doctype.bulk_sms.bulk_sms import mark_recipient_retried
+		mark_recipient_retried(sms.reference_name, values["sent_datetime"])
+
+def release_stale_claims():
+	"""Fail rows whose claiming worker died before recording a result.
+
+	The message may already have reached the gateway, so it is not resent.
+	"""
+	frappe.db.sql("""
+		UPDATE `tabScheduled SMS`
+		SET status = 'Failed', claim_token = NULL,
+			error_message = 'Delivery unknown: worker stopped while sending'
+		WHERE status = 'Sending' AND claimed_at < %s
+	""", (add_to_date(now_datetime(), seconds=-PENDING_SMS_CLAIM_TIMEOUT),))
+	frappe.db.commit()
+
 def cleanup_old_logs():
 	"""Cleanup old SMS logs to prevent database bloat"""
 	try:
@@ -0,0 +1,259 @@
+"""Trigger handlers for SMS Trigger Rules.
+
+A handler declares how one trigger type finds its candidates, how they are
+deduplicated against SMS already scheduled, and the template context of each
+message. The engine runs the same pipeline for every type: query, dedup,
+render and bulk insert (see `trigger_engine.run_trigger_rule`).
+
+Other apps register handlers for new or existing trigger types in their
+hooks.py, the last registration of a type wins:
+
+	sms_trigger_handlers = {
+		"Loyalty Tier": "my_app.sms.LoyaltyTierHandler",
+	}
+
+A candidate is a dict with at least `customer`, `customer_name` and
+`mobile_no` (normalized).
+"""
+
+import frappe
+from frappe.utils import add_days, getdate, today
+
+from sms_trigger.sms_trigger.utils.conditions import get_condition_plan
+
+
+class TriggerHandler:
+	"""Base handler: customers matching the rule conditions, one SMS per customer per `dedup_days`"""
+
+	trigger_type = None
+	dedup_days = 30
+	reference_doctype = None
+
+	def __init__(self, rule):
+		self.rule = rule
+		self.trigger_type = rule.trigger_type
+		self.plan = get_condition_plan(rule)
+
+	def get_candidates(self):
+		"""Candidate rows for this run"""
+		filters = self.plan.get_filters()
+		filters.append(["normalized_mobile_no", "is", "set"])
+		filters.append(["sms_enabled", "!=", 0])
+		return frappe.get_all("Customer",
+			filters=filters,
+			fields=["name as customer", "customer_name", "normalized_mobile_no as mobile_no"]
+		)
+
+	def count_candidates(self):
+		return len(self.get_candidates())
+
+	def get_dedup_key(self, candidate):
+		return candidate.customer
+
+	def get_scheduled_keys(self, candidates):
+		"""Dedup keys that already have an SMS of this trigger type"""
+		from sms_trigger.sms_trigger.utils.trigger_engine import get_scheduled_customers
+
+		return get_scheduled_customers(self.trigger_type, add_days(getdate(), -self.dedup_days))
+
+	def get_context(self, candidate):
+		return {
+			"customer_name": candidate.customer_name,
+			"today": today(),
+		}
+
+	def get_reference_name(self, candidate):
+		return None
+
+
+class CustomerFilterHandler(TriggerHandler):
+	"""Customer Type, Customer Group, Gender and Religion: only the rule conditions select customers"""
+
+	def count_candidates(self):
+		filters = self.plan.get_filters()
+		filters.append(["normalized_mobile_no", "is", "set"])
+		filters.append(["sms_enabled", "!=", 0])
+		return frappe.db.count("Customer", filters)
+
+
+class InvoiceDueHandler(TriggerHandler):
+	"""Overdue Sales Invoices, one SMS per invoice"""
+
+	reference_doctype = "Sales Invoice"
+
+	def get_candidates(self):
+		due_date = add_days(getdate(), -(self.rule.days_interval or 7))
+		conditions, values = self.plan.get_sql("c")
+		return frappe.db.sql(f"""
+			SELECT si.customer, si.name AS invoice, si.due_date, si.outstanding_amount,
+				c.customer_name, c.normalized_mobile_no AS mobile_no
+			FROM `tabSales Invoice` si
+			JOIN `tabCustomer` c ON c.name = si.customer
+			WHERE si.docstatus = 1
+			AND si.outstanding_amount > 0
+			AND si.due_date <= %(due_date)s
+			AND IFNULL(c.normalized_mobile_no, '') != ''
+			AND IFNULL(c.sms_enabled, 1) = 1
+			{conditions}
+		""", {**values, "due_date": due_date}, as_dict=True)
+
+	def get_dedup_key(self, candidate):
+		return candidate.invoice
+
+	def get_scheduled_keys(self, candidates):
+		invoices = list({c.invoice for c in candidates})
+		scheduled = set()
+		for start in range(0, len(invoices), 1000):
+			scheduled.update(frappe.get_all("Scheduled SMS",
+				filters={
+					"trigger_type": self.trigger_type,
+					"reference_doctype": self.reference_doctype,
+					"reference_name": ["in", invoices[start:start + 1000]],
+				},
+				pluck="reference_name"
+			))
+		return scheduled
+
+	def get_context(self, candidate):
+		return {
+			"customer_name": candidate.customer_name,
+			"invoice_no": candidate.invoice,
+			"amount": candidate.outstanding_amount,
+			"due_date": candidate.due_date,
+			"today": today(),
+		}
+
+	def get_reference_name(self, candidate):
+		return candidate.invoice
+
+
+class BirthdayHandler(TriggerHandler):
+	"""Birthdays `days_before` ahead, on the indexed month-day key"""
+
+	def __init__(self, rule):
+		from sms_trigger.sms_trigger.utils.birthdays import get_birthday_window
+
+		super().__init__(rule)
+		self.start_date, self.end_date, self.run_since = get_birthday_window(rule)
+
+	def get_candidates(self):
+		from sms_trigger.sms_trigger.utils.birthdays import get_birthday_customers
+
+		return get_birthday_customers(self.start_date, self.end_date, self.plan)
+
+	def get_scheduled_keys(self, candidates):
+		from sms_trigger.sms_trigger.utils.trigger_engine import get_scheduled_customers
+
+		return get_scheduled_customers(self.trigger_type, self.run_since)
+
+	def get_context(self, candidate):
+		context = super().get_context(candidate)
+		context["date_of_birth"] = candidate.date_of_birth
+		return context
+
+
+class InactiveCustomerHandler(TriggerHandler):
+	"""No purchase in `days_interval` days, on the last purchase date watermark"""
+
+	def get_candidates(self):
+		cutoff_date = add_days(getdate(), -(self.rule.days_interval or 90))
+		conditions, values = self.plan.get_sql("c")
+		return frappe.db.sql(f"""
+			SELECT c.name AS customer, c.customer_name, c.normalized_mobile_no AS mobile_no, c.last_purchase_date
+			FROM `tabCustomer` c
+			WHERE (c.last_purchase_date < %(cutoff_date)s OR c.last_purchase_date IS NULL)
+			AND IFNULL(c.normalized_mobile_no, '') != ''
+			AND IFNULL(c.sms_enabled, 1) = 1
+			{conditions}
+		""", {**values, "cutoff_date": cutoff_date}, as_dict=True)
+
+	def get_context(self, candidate):
+		context = super().get_context(candidate)
+		context["last_purchase_date"] = candidate.last_purchase_date
+		return context
+
+
+class FollowUpHandler(TriggerHandler):
+	"""Follow up `days_interval` days after a customer's last purchase"""
+
+	def get_candidates(self):
+		purchase_date = add_days(getdate(), -(self.rule.days_interval or 7))
+		conditions, values = self.plan.get_sql("c")
+		return frappe.db.sql(f"""
+			SELECT c.name AS customer, c.customer_name, c.normalized_mobile_no AS mobile_no, c.last_purchase_date
+			FROM `tabCustomer` c
+			WHERE c.last_purchase_date = %(purchase_date)s
+			AND IFNULL(c.normalized_mobile_no, '') != ''
+			AND IFNULL(c.sms_enabled, 1) = 1
+			{conditions}
+		""", {**values, "purchase_date": purchase_date}, as_dict=True)
+
+	def get_scheduled_keys(self, candidates):
+		from sms_trigger.sms_trigger.utils.trigger_engine import get_scheduled_customers
+
+		return get_scheduled_customers(self.trigger_type, add_days(getdate(), -(self.rule.days_interval or 7)))
+
+	def get_context(self, candidate):
+		context = super().get_context(candidate)
+		context["last_purchase_date"] = candidate.last_purchase_date
+		return context
+
+
+class RepurchasePromotionHandler(TriggerHandler):
+	"""Customers who bought the rule's `item_code` in the last `days_interval` days"""
+
+	dedup_days = 7
+
+	def get_candidates(self):
+		item_code = self.plan.params.item_code
+		if not item_code:
+			return []
+
+		cutoff_date = add_days(getdate(), -(self.rule.days_interval or 30))
+		conditions, values = self.plan.get_sql("c")
+		return frappe.db.sql(f"""
+			SELECT DISTINCT si.customer, c.customer_name, c.normalized_mobile_no AS mobile_no, c.last_purchase_date
+			FROM `tabSales Invoice` si
+			JOIN `tabSales Invoice Item` sii ON sii.parent = si.name
+			JOIN `tabCustomer` c ON c.name = si.customer
+			WHERE c.last_purchase_date >= %(cutoff_date)s
+			AND sii.item_code = %(item_code)s
+			AND si.docstatus = 1
+			AND si.posting_date >= %(cutoff_date)s
+			AND IFNULL(c.normalized_mobile_no, '') != ''
+			AND IFNULL(c.sms_enabled, 1) = 1
+			{conditions}
+		""", {**values, "item_code": item_code, "cutoff_date": cutoff_date}, as_dict=True)
+
+	def get_context(self, candidate):
+		context = super().get_context(candidate)
+		context["item_code"] = self.plan.params.item_code
+		context["last_purchase_date"] = candidate.last_purchase_date
+		return context
+
+
+HANDLERS = {
+	"Invoice Due": "sms_trigger.sms_trigger.utils.trigger_handlers.InvoiceDueHandler",
+	"Birthday": "sms_trigger.sms_trigger.utils.trigger_handlers.BirthdayHandler",
+	"Follow-up": "sms_trigger.sms_trigger.utils.trigger_handlers.FollowUpHandler",
+	"Customer Type": "sms_trigger.sms_trigger.utils.trigger_handlers.CustomerFilterHandler",
+	"Customer Group": "sms_trigger.sms_trigger.utils.trigger_handlers.CustomerFilterHandler",
+	"Customer Gender": "sms_trigger.sms_trigger.utils.trigger_handlers.CustomerFilterHandler",
+	"Customer Religion": "sms_trigger.sms_trigger.utils.trigger_handlers.CustomerFilterHandler",
+	"Inactive Customer": "sms_trigger.sms_trigger.utils.trigger_handlers.InactiveCustomerHandler",
+	"Repurchase Promotion": "sms_trigger.sms_trigger.utils.trigger_handlers.RepurchasePromotionHandler",
+}
+
+
+def get_handlers():
+	"""Trigger type -> handler path, built-in handlers overridden by the `sms_trigger_handlers` hook"""
+	handlers = dict(HANDLERS)
+	for trigger_type, paths in (frappe.get_hooks("sms_trigger_handlers") or {}).items():
+		handlers[trigger_type] = paths[-1]
+	return handlers
+
+
+def get_handler(rule):
+	"""Handler instance for `rule`, None for types that are not run on a schedule (e.g. POS Invoice)"""
+	path = get_handlers().get(rule.trigger_type)
+	return frappe.get_attr(path)(rule) if path else None